@@ -1,13 +1,22 @@
 import json
+import numpy as np
 import pandas as pd
 from collections import Counter
 from datetime import datetime, timedelta
-import os
 import zipfile
 import fnmatch
+import re
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from rich.console import Console
 from rich.table import Table
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 TIMESTAMP_COL = 'ts'
 TRACK_NAME_COL = 'master_metadata_track_name'
 ARTIST_NAME_COL = 'master_metadata_album_artist_name'
@@ -15,16 +24,49 @@ MS_PLAYED_COL = 'ms_played'
 EPISODE_NAME_COL = 'episode_name'
 MIN_MS_PLAYED_FOR_COUNT = 15000
 
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ' # 'ts' trong Extended Streaming History
+LEGACY_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M' # 'endTime' trong StreamingHistoryX.json
+
 ZIP_FILE_PATH = "./data/my_spotify_data.zip"
+MAX_ZIP_READ_WORKERS = 8
 INTERNAL_JSON_PATTERN = "Streaming_History_*.json" # Handles both StreamingHistoryX.json and Streaming_History_Audio_*.json
 
+EXCEL_ENGINE = 'xlsxwriter' if importlib.util.find_spec('xlsxwriter') else 'openpyxl'
+
 console = Console()
 
+def load_json_frame_from_zip(zip_file_path, file_name_in_zip):
+    """Đọc một tệp JSON bên trong tệp ZIP và chuyển nội dung thành DataFrame.
+
+    Dùng `orjson` nếu đã được cài đặt (nhanh hơn `json` của thư viện chuẩn).
+    Mỗi lần gọi tự mở một `zipfile.ZipFile` riêng vì một đối tượng `ZipFile`
+    không an toàn khi nhiều luồng cùng đọc. Nhờ vậy nhiều tệp có thể được
+    giải nén song song (zlib nhả GIL trong lúc giải nén).
+
+    Args:
+        zip_file_path (str): Đường dẫn đến tệp ZIP.
+        file_name_in_zip (str): Tên tệp JSON bên trong ZIP.
+
+    Returns:
+        pd.DataFrame | None: DataFrame chứa các mục của tệp JSON,
+                             hoặc None nếu tệp rỗng hoặc xảy ra lỗi.
+    """
+    try:
+        with zipfile.ZipFile(zip_file_path, 'r') as zf:
+            data = json_loads(zf.read(file_name_in_zip))
+        return pd.DataFrame(data) if data else None
+    except json.JSONDecodeError as e_json:
+        console.print(f"| ❌ Lỗi giải mã JSON từ tệp '[yellow]{file_name_in_zip}[/yellow]' trong ZIP: {e_json}", style="red")
+    except Exception as e_file:
+        console.print(f"| ❌ Lỗi khi đọc tệp '[yellow]{file_name_in_zip}[/yellow]' từ ZIP: {e_file}", style="red")
+    return None
+
 def load_streaming_data_from_zip(zip_file_path, internal_file_pattern="Streaming_History_*.json"):
     """Tải dữ liệu lịch sử nghe nhạc từ tệp ZIP của Spotify.
 
     Hàm này đọc tệp ZIP được cung cấp, tìm các tệp JSON khớp với `internal_file_pattern`
-    (mặc định là "Streaming_History_*.json"), và gộp nội dung của chúng vào một DataFrame.
+    (mặc định là "Streaming_History_*.json"), đọc song song từng tệp thành DataFrame
+    (tối đa `MAX_ZIP_READ_WORKERS` luồng) và gộp chúng vào một DataFrame.
     Xử lý các trường hợp lỗi như không tìm thấy tệp ZIP, tệp ZIP không hợp lệ,
     hoặc lỗi giải mã JSON.
 
@@ -37,13 +79,13 @@ def load_streaming_data_from_zip(zip_file_path, internal_file_pattern="Streaming
         pd.DataFrame: DataFrame chứa tất cả các mục từ các tệp JSON,
                       hoặc DataFrame rỗng nếu không có dữ liệu hoặc xảy ra lỗi.
     """
-    all_entries = []
     console.print(f"| 🔄 Đang cố gắng đọc từ file ZIP: [cyan]{zip_file_path}[/cyan]")
     try:
         with zipfile.ZipFile(zip_file_path, 'r') as zf:
+            file_name_regex = re.compile(fnmatch.translate(internal_file_pattern))
             json_files_in_zip = [
                 name for name in zf.namelist()
-                if fnmatch.fnmatch(os.path.basename(name), internal_file_pattern) and name.endswith(".json")
+                if name.endswith(".json") and file_name_regex.match(name.rsplit('/', 1)[-1])
             ]
 
             if not json_files_in_zip:
@@ -51,16 +93,11 @@ def load_streaming_data_from_zip(zip_file_path, internal_file_pattern="Streaming
                 console.print(f"|    Các tệp có trong ZIP: {zf.namelist()}")
                 return pd.DataFrame()
 
-            for file_name_in_zip in json_files_in_zip:
-                try:
-                    with zf.open(file_name_in_zip) as f:
-                        file_content = f.read().decode('utf-8')
-                        data = json.loads(file_content)
-                        all_entries.extend(data)
-                except json.JSONDecodeError as e_json:
-                    console.print(f"| ❌ Lỗi giải mã JSON từ tệp '[yellow]{file_name_in_zip}[/yellow]' trong ZIP: {e_json}", style="red")
-                except Exception as e_file:
-                    console.print(f"| ❌ Lỗi khi đọc tệp '[yellow]{file_name_in_zip}[/yellow]' từ ZIP: {e_file}", style="red")
+        # Chuyển từng tệp thành DataFrame ngay để list các dict được giải phóng sớm.
+        max_workers = min(MAX_ZIP_READ_WORKERS, len(json_files_in_zip))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(partial(load_json_frame_from_zip, zip_file_path), json_files_in_zip)
+            frames = [frame for frame in results if frame is not None]
     except FileNotFoundError:
         console.print(f"| 🚫 Không tìm thấy tệp ZIP: [cyan]{zip_file_path}[/cyan]", style="red")
         return pd.DataFrame()
@@ -71,12 +108,13 @@ def load_streaming_data_from_zip(zip_file_path, internal_file_pattern="Streaming
         console.print(f"| ❌ Lỗi không xác định khi xử lý tệp ZIP: {e_zip}", style="red")
         return pd.DataFrame()
 
-    if not all_entries:
+    if not frames:
         console.print("| 🤷 Không có dữ liệu nào được tải từ các tệp JSON trong ZIP.", style="yellow")
         return pd.DataFrame()
 
-    df = pd.DataFrame(all_entries)
-    return df
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
 
 def preprocess_data(df):
     """Tiền xử lý DataFrame dữ liệu thô từ Spotify.
@@ -87,10 +125,13 @@ def preprocess_data(df):
     3. Xử lý trường hợp thiếu tên nghệ sĩ (`ARTIST_NAME_COL`) bằng cách điền 'Không xác định'.
     4. Chuyển đổi kiểu dữ liệu cho cột thời gian (`TIMESTAMP_COL`) sang datetime và
        thời gian nghe (`MS_PLAYED_COL`) sang numeric.
-    5. Loại bỏ khoảng trắng thừa ở đầu và cuối tên bài hát và tên nghệ sĩ.
-    6. Loại bỏ các dòng có giá trị rỗng (NaN) ở các cột quan trọng (`TIMESTAMP_COL`, `TRACK_NAME_COL`, `MS_PLAYED_COL`).
-    7. Lọc các bản nhạc được nghe dưới `MIN_MS_PLAYED_FOR_COUNT` (mặc định 15 giây).
-    8. Tạo cột 'year' từ timestamp và 'fullSongName' (Tên bài hát - Tên nghệ sĩ).
+    5. Loại bỏ các dòng có giá trị rỗng (NaN) ở các cột quan trọng (`TIMESTAMP_COL`, `TRACK_NAME_COL`, `MS_PLAYED_COL`)
+       và lọc các bản nhạc được nghe dưới `MIN_MS_PLAYED_FOR_COUNT` (mặc định 15 giây)
+       bằng một mask duy nhất, chỉ tạo bản sao DataFrame một lần.
+    6. Loại bỏ khoảng trắng thừa ở đầu và cuối tên bài hát và tên nghệ sĩ.
+    7. Tạo cột 'year' (int16) từ timestamp.
+    8. Chuyển `TRACK_NAME_COL` và `ARTIST_NAME_COL` sang kiểu 'category' để các phép nhóm
+       chạy trên mã số nguyên thay vì chuỗi.
 
     Args:
         df (pd.DataFrame): DataFrame chứa dữ liệu thô được tải từ các tệp JSON.
@@ -113,55 +154,69 @@ def preprocess_data(df):
     df.rename(columns=lambda c: column_mapping.get(c, c), inplace=True)
 
     required_cols_for_songs = [TIMESTAMP_COL, TRACK_NAME_COL, ARTIST_NAME_COL, MS_PLAYED_COL]
+    cols = set(df.columns)
 
-    if not all(col in df.columns for col in required_cols_for_songs):
-        missing = [col for col in required_cols_for_songs if col not in df.columns]
+    missing = [col for col in required_cols_for_songs if col not in cols]
+    if missing:
         console.print(f"| 🚫 LỖI: Thiếu cột bài hát bắt buộc: {', '.join(missing)}.", style="red")
         console.print(f"|    Các cột có trong dữ liệu: {list(df.columns)}")
-        if TRACK_NAME_COL not in df.columns and EPISODE_NAME_COL in df.columns:
+        if TRACK_NAME_COL not in cols and EPISODE_NAME_COL in cols:
             console.print("| ⚠️ Chỉ có dữ liệu podcast (episode_name). Sẽ bỏ qua phân tích bài hát.", style="yellow")
         elif ARTIST_NAME_COL not in missing or len(missing) == 1 and ARTIST_NAME_COL in missing:
              pass
         else:
             return pd.DataFrame()
 
-    df_songs = df[df[TRACK_NAME_COL].notna()].copy()
+    track_notna = df[TRACK_NAME_COL].notna()
 
-    if df_songs.empty:
+    if not track_notna.any():
         console.print("| 🤷 Không có bài hát nào (dữ liệu track_name bị thiếu hoặc rỗng) để phân tích.", style="yellow")
         return pd.DataFrame()
 
-    if ARTIST_NAME_COL not in df_songs.columns:
+    if ARTIST_NAME_COL not in cols:
         console.print(f"| ⚠️ Cột '{ARTIST_NAME_COL}' không tìm thấy. Sẽ sử dụng 'Không xác định' cho tên nghệ sĩ.", style="yellow")
-        df_songs[ARTIST_NAME_COL] = "Không xác định"
+        cols.add(ARTIST_NAME_COL)
 
 
-    if not all(col in df_songs.columns for col in required_cols_for_songs):
-        missing_after_fill = [col for col in required_cols_for_songs if col not in df_songs.columns]
+    missing_after_fill = [col for col in required_cols_for_songs if col not in cols]
+    if missing_after_fill:
         console.print(f"| 🚫 LỖI: Thiếu cột bài hát thiết yếu sau khi xử lý: {', '.join(missing_after_fill)}.", style="red")
         return pd.DataFrame()
 
 
-    df_songs[MS_PLAYED_COL] = pd.to_numeric(df_songs[MS_PLAYED_COL], errors='coerce')
-    df_songs[TIMESTAMP_COL] = pd.to_datetime(df_songs[TIMESTAMP_COL], errors='coerce')
-
-    if TRACK_NAME_COL in df_songs.columns and df_songs[TRACK_NAME_COL].dtype == 'object':
-        df_songs[TRACK_NAME_COL] = df_songs[TRACK_NAME_COL].str.strip()
-    if ARTIST_NAME_COL in df_songs.columns and df_songs[ARTIST_NAME_COL].dtype == 'object':
-        df_songs[ARTIST_NAME_COL] = df_songs[ARTIST_NAME_COL].str.strip()
+    ms_played = pd.to_numeric(df[MS_PLAYED_COL], errors='coerce')
+    raw_timestamps = df[TIMESTAMP_COL]
+    timestamps = pd.to_datetime(raw_timestamps, format=TIMESTAMP_FORMAT, utc=True, errors='coerce', cache=True)
+    unparsed = timestamps.isna() & raw_timestamps.notna()
+    if unparsed.any():
+        timestamps[unparsed] = pd.to_datetime(raw_timestamps[unparsed], format=LEGACY_TIMESTAMP_FORMAT, utc=True, errors='coerce', cache=True)
 
-    df_songs.dropna(subset=[TIMESTAMP_COL, TRACK_NAME_COL, MS_PLAYED_COL], inplace=True)
-    if df_songs.empty:
+    # Gộp các điều kiện lọc thành một mask để chỉ tạo DataFrame mới một lần.
+    mask = track_notna & timestamps.notna() & ms_played.notna()
+    if not mask.any():
         console.print("| 🗑️ Không có dữ liệu hợp lệ sau khi loại bỏ NaN từ các cột bài hát thiết yếu.", style="yellow")
         return pd.DataFrame()
 
-    df_songs = df_songs[df_songs[MS_PLAYED_COL] >= MIN_MS_PLAYED_FOR_COUNT].copy()
-    if df_songs.empty:
+    mask &= ms_played >= MIN_MS_PLAYED_FOR_COUNT
+    if not mask.any():
         console.print(f"| 🎧 Không có bài hát nào được nghe quá {MIN_MS_PLAYED_FOR_COUNT/1000} giây.", style="yellow")
         return pd.DataFrame()
 
-    df_songs['year'] = df_songs[TIMESTAMP_COL].dt.year
-    df_songs['fullSongName'] = df_songs[TRACK_NAME_COL] + " - " + df_songs[ARTIST_NAME_COL].fillna("Không xác định")
+    df_songs = df.loc[mask].copy()
+    df_songs[MS_PLAYED_COL] = ms_played[mask]
+    df_songs[TIMESTAMP_COL] = timestamps[mask]
+    if ARTIST_NAME_COL not in df_songs.columns:
+        df_songs[ARTIST_NAME_COL] = "Không xác định"
+
+    # Chuỗi có thể là 'object' hoặc kiểu string (Arrow) tuỳ phiên bản pandas/pyarrow.
+    if pd.api.types.is_string_dtype(df_songs[TRACK_NAME_COL]):
+        df_songs[TRACK_NAME_COL] = df_songs[TRACK_NAME_COL].str.strip()
+    if pd.api.types.is_string_dtype(df_songs[ARTIST_NAME_COL]):
+        df_songs[ARTIST_NAME_COL] = df_songs[ARTIST_NAME_COL].str.strip()
+
+    df_songs['year'] = df_songs[TIMESTAMP_COL].dt.year.astype('int16')
+    df_songs[TRACK_NAME_COL] = df_songs[TRACK_NAME_COL].astype('category')
+    df_songs[ARTIST_NAME_COL] = df_songs[ARTIST_NAME_COL].astype('category')
 
     processed_count = len(df_songs)
     if initial_count > 0 and processed_count > 0:
@@ -188,50 +243,63 @@ def format_ms_to_detailed_play_time_string(ms):
     total_hours = total_minutes / 60
     return f"{total_minutes:,} phút ({total_hours:.1f} giờ)"
 
+def format_ms_series_to_detailed_play_time_strings(ms_series):
+    """Phiên bản vector hoá của `format_ms_to_detailed_play_time_string` cho cả một Series.
+
+    Phép chia lấy phút/giờ được thực hiện trên mảng số nguyên numpy thay vì gọi
+    hàm Python cho từng dòng qua `.apply`. Giá trị NaN hoặc âm được coi là 0.
+
+    Args:
+        ms_series (pd.Series): Series thời gian nghe tính bằng miligiây.
+
+    Returns:
+        pd.Series: Series chuỗi thời gian đã định dạng, giữ nguyên index của đầu vào.
+    """
+    total_minutes = ms_series.fillna(0).clip(lower=0).to_numpy(dtype=np.int64) // 60000
+    total_hours = total_minutes / 60
+    return pd.Series(
+        [f"{m:,} phút ({h:.1f} giờ)" for m, h in zip(total_minutes.tolist(), total_hours.tolist())],
+        index=ms_series.index,
+        dtype=object,
+    )
+
 def calculate_top_songs_data(df, top_n=10):
     """Tính toán top N bài hát dựa trên số lần nghe và tổng thời gian nghe.
 
-    Hàm này nhóm dữ liệu theo 'fullSongName' (Tên bài hát - Tên nghệ sĩ),
+    Hàm này nhóm dữ liệu theo cặp (`TRACK_NAME_COL`, `ARTIST_NAME_COL`),
     đếm số lần nghe và tính tổng thời gian nghe (ms) cho mỗi bài.
-    Nếu 'fullSongName' không tồn tại, nó sẽ được tạo từ `TRACK_NAME_COL` và `ARTIST_NAME_COL`.
-    Sau đó, sắp xếp để lấy ra `top_n` bài hát hàng đầu.
+    Bài hát thiếu tên nghệ sĩ vẫn được giữ lại (nghệ sĩ là NaN trong index).
+    Sau đó, dùng `nlargest` để lấy ra `top_n` bài hát hàng đầu mà không cần sắp xếp toàn bộ.
 
     Args:
         df (pd.DataFrame): DataFrame chứa dữ liệu bài hát đã được tiền xử lý.
-                           Cần có cột `MS_PLAYED_COL` và các cột để tạo 'fullSongName'
-                           (`TRACK_NAME_COL`, `ARTIST_NAME_COL`).
+                           Cần có cột `MS_PLAYED_COL`, `TRACK_NAME_COL` và `ARTIST_NAME_COL`.
         top_n (int, optional): Số lượng bài hát hàng đầu muốn lấy. Mặc định là 10.
 
     Returns:
-        pd.DataFrame: DataFrame chứa top N bài hát, với index là 'fullSongName'
+        pd.DataFrame: DataFrame chứa top N bài hát, với MultiIndex là (`TRACK_NAME_COL`, `ARTIST_NAME_COL`)
                       và các cột 'Số lần nghe', 'Tổng thời gian nghe (ms)'.
                       Trả về DataFrame rỗng nếu không có dữ liệu hoặc thiếu cột cần thiết.
     """
     if df.empty: return pd.DataFrame()
-    df_copy = df.copy()
-
-    if 'fullSongName' not in df_copy.columns:
-        if TRACK_NAME_COL in df_copy.columns and ARTIST_NAME_COL in df_copy.columns:
-            df_copy['fullSongName'] = df_copy[TRACK_NAME_COL] + " - " + df_copy[ARTIST_NAME_COL].fillna("Không xác định")
-        elif TRACK_NAME_COL in df_copy.columns:
-            console.print("| ⚠️ Thiếu 'ARTIST_NAME_COL', 'fullSongName' sẽ chỉ dựa trên 'TRACK_NAME_COL'.", style="yellow")
-            df_copy['fullSongName'] = df_copy[TRACK_NAME_COL]
-        else:
-            console.print("| 🚫 Không thể tạo 'fullSongName' do thiếu 'TRACK_NAME_COL'.", style="red")
-            return pd.DataFrame()
 
-    counts = df_copy['fullSongName'].value_counts()
-    times = df_copy.groupby('fullSongName')[MS_PLAYED_COL].sum()
+    if TRACK_NAME_COL not in df.columns:
+        console.print("| 🚫 Không thể tính top bài hát do thiếu 'TRACK_NAME_COL'.", style="red")
+        return pd.DataFrame()
+    if ARTIST_NAME_COL not in df.columns:
+        console.print("| ⚠️ Thiếu 'ARTIST_NAME_COL', nghệ sĩ sẽ được ghi là 'Không xác định'.", style="yellow")
+        df = df.assign(**{ARTIST_NAME_COL: "Không xác định"})
 
-    top_df = pd.DataFrame({'Số lần nghe': counts, 'Tổng thời gian nghe (ms)': times})
-    return top_df.sort_values(by=['Số lần nghe', 'Tổng thời gian nghe (ms)'], ascending=[False, False]).head(top_n)
+    top_df = df.groupby([TRACK_NAME_COL, ARTIST_NAME_COL], sort=False, observed=True, dropna=False)[MS_PLAYED_COL].agg(['size', 'sum'])
+    top_df.columns = ['Số lần nghe', 'Tổng thời gian nghe (ms)']
+    return top_df.nlargest(top_n, ['Số lần nghe', 'Tổng thời gian nghe (ms)'])
 
 def calculate_top_artists_data(df, top_n=10):
     """Tính toán top N nghệ sĩ dựa trên số lần nghe và tổng thời gian nghe các bài hát của họ.
 
     Hàm này nhóm dữ liệu theo `ARTIST_NAME_COL`, đếm tổng số lần các bài hát
     của nghệ sĩ đó được nghe và tính tổng thời gian nghe (ms) cho mỗi nghệ sĩ.
-    Sau đó, sắp xếp để lấy ra `top_n` nghệ sĩ hàng đầu.
+    Sau đó, dùng `nlargest` để lấy ra `top_n` nghệ sĩ hàng đầu mà không cần sắp xếp toàn bộ.
     Yêu cầu cột `ARTIST_NAME_COL` phải tồn tại và không rỗng trong dữ liệu.
 
     Args:
@@ -249,25 +317,57 @@ def calculate_top_artists_data(df, top_n=10):
         console.print("| 🤷 Không có dữ liệu nghệ sĩ hoặc thiếu cột 'ARTIST_NAME_COL'.", style="yellow")
         return pd.DataFrame()
 
-    df_artists = df[df[ARTIST_NAME_COL].notna()].copy()
-    if df_artists.empty:
+    if not df[ARTIST_NAME_COL].notna().any():
         console.print("| 🤷 Không có dữ liệu nghệ sĩ hợp lệ (tên nghệ sĩ bị thiếu).", style="yellow")
         return pd.DataFrame()
 
-    artist_play_counts = df_artists[ARTIST_NAME_COL].value_counts()
-    artist_total_time_ms = df_artists.groupby(ARTIST_NAME_COL)[MS_PLAYED_COL].sum()
+    # groupby tự bỏ qua các dòng có tên nghệ sĩ NaN nên không cần lọc và sao chép DataFrame.
+    top_artists_df = df.groupby(ARTIST_NAME_COL, sort=False, observed=True)[MS_PLAYED_COL].agg(['size', 'sum'])
+    top_artists_df.columns = ['Số lần nghe', 'Tổng thời gian nghe (ms)']
 
-    top_artists_df = pd.DataFrame({
-        'Số lần nghe': artist_play_counts,
-        'Tổng thời gian nghe (ms)': artist_total_time_ms
-    })
+    return top_artists_df.nlargest(top_n, ['Số lần nghe', 'Tổng thời gian nghe (ms)'])
 
-    return top_artists_df.sort_values(
-        by=['Số lần nghe', 'Tổng thời gian nghe (ms)'],
-        ascending=[False, False]
-    ).head(top_n)
+def calculate_yearly_top_data(df, top_n=10):
+    """Tính toán top N bài hát và top N nghệ sĩ cho từng năm.
 
-def display_analysis_results(df_period_songs, period_name_display, top_n=10):
+    Thay vì lọc DataFrame theo từng năm rồi nhóm lại nhiều lần, hàm này nhóm
+    một lần theo ('year', `TRACK_NAME_COL`, `ARTIST_NAME_COL`) và một lần theo ('year', `ARTIST_NAME_COL`),
+    sau đó chỉ tách các bảng tổng hợp (nhỏ hơn nhiều) theo năm để lấy top N.
+
+    Args:
+        df (pd.DataFrame): DataFrame chứa dữ liệu bài hát đã được tiền xử lý.
+                           Cần có các cột 'year', `TRACK_NAME_COL`, `ARTIST_NAME_COL` và `MS_PLAYED_COL`.
+        top_n (int, optional): Số lượng mục hàng đầu muốn lấy cho mỗi năm. Mặc định là 10.
+
+    Returns:
+        dict: Dictionary với key là năm và value là tuple (top_songs_df, top_artists_df),
+              cùng định dạng với kết quả của `calculate_top_songs_data` và
+              `calculate_top_artists_data`. Trả về dict rỗng nếu không có dữ liệu.
+    """
+    if df.empty:
+        return {}
+
+    sort_cols = ['Số lần nghe', 'Tổng thời gian nghe (ms)']
+    songs_agg = df.groupby(['year', TRACK_NAME_COL, ARTIST_NAME_COL], sort=False, observed=True, dropna=False)[MS_PLAYED_COL].agg(['size', 'sum'])
+    songs_agg.columns = sort_cols
+    artists_agg = df.groupby(['year', ARTIST_NAME_COL], sort=False, observed=True)[MS_PLAYED_COL].agg(['size', 'sum'])
+    artists_agg.columns = sort_cols
+
+    songs_by_year = dict(iter(songs_agg.groupby(level='year', sort=False)))
+    artists_by_year = dict(iter(artists_agg.groupby(level='year', sort=False)))
+
+    yearly_top_data = {}
+    for year, year_songs in songs_by_year.items():
+        top_songs = year_songs.droplevel('year').nlargest(top_n, sort_cols)
+        year_artists = artists_by_year.get(year)
+        if year_artists is None:
+            top_artists = pd.DataFrame()
+        else:
+            top_artists = year_artists.droplevel('year').nlargest(top_n, sort_cols)
+        yearly_top_data[year] = (top_songs, top_artists)
+    return yearly_top_data
+
+def display_analysis_results(df_period_songs, period_name_display, top_n=10, top_songs=None, top_artists=None):
     """Hiển thị kết quả phân tích cho một giai đoạn nhất định lên console.
 
     Bao gồm thống kê chung (số bài hát/nghệ sĩ duy nhất, tổng thời gian nghe)
@@ -279,6 +379,10 @@ def display_analysis_results(df_period_songs, period_name_display, top_n=10):
         period_name_display (str): Tên hiển thị cho giai đoạn (ví dụ: "Tất Cả Thời Gian", "NĂM 2023").
         top_n (int, optional): Số lượng mục (bài hát/nghệ sĩ) hàng đầu để hiển thị trong các bảng.
                                Mặc định là 10.
+        top_songs (pd.DataFrame, optional): Kết quả `calculate_top_songs_data` đã tính sẵn
+                                            (ít nhất `top_n` dòng). Nếu None sẽ tự tính.
+        top_artists (pd.DataFrame, optional): Kết quả `calculate_top_artists_data` đã tính sẵn
+                                              (ít nhất `top_n` dòng). Nếu None sẽ tự tính.
     """
     console.print(f"\n📊 [bold green]{period_name_display}[/bold green]")
 
@@ -286,11 +390,11 @@ def display_analysis_results(df_period_songs, period_name_display, top_n=10):
         console.print("|   🤷 Không có dữ liệu để phân tích cho giai đoạn này.", style="yellow")
         return
 
-    num_unique_songs = df_period_songs['fullSongName'].nunique()
+    num_unique_songs = df_period_songs.groupby([TRACK_NAME_COL, ARTIST_NAME_COL], sort=False, observed=True, dropna=False).ngroups
 
     num_unique_artists = 0
-    if ARTIST_NAME_COL in df_period_songs.columns and not df_period_songs[df_period_songs[ARTIST_NAME_COL].notna()][ARTIST_NAME_COL].empty:
-        num_unique_artists = df_period_songs[df_period_songs[ARTIST_NAME_COL].notna()][ARTIST_NAME_COL].nunique()
+    if ARTIST_NAME_COL in df_period_songs.columns:
+        num_unique_artists = df_period_songs[ARTIST_NAME_COL].nunique(dropna=True)
 
     total_ms_played = df_period_songs[MS_PLAYED_COL].sum()
     total_time_str = format_ms_to_detailed_play_time_string(total_ms_played)
@@ -299,7 +403,10 @@ def display_analysis_results(df_period_songs, period_name_display, top_n=10):
 
     console.print(f"| 🔊 [bold]Bảng Top {top_n} Bài Hát và Nghệ Sĩ Nghe Nhiều Nhất:[/bold]")
 
-    top_songs = calculate_top_songs_data(df_period_songs, top_n=top_n)
+    if top_songs is None:
+        top_songs = calculate_top_songs_data(df_period_songs, top_n=top_n)
+    else:
+        top_songs = top_songs.head(top_n)
     if not top_songs.empty:
         songs_table = Table(show_lines=False, header_style="blue")
         songs_table.add_column("STT", style="dim", width=3, justify="right")
@@ -308,31 +415,29 @@ def display_analysis_results(df_period_songs, period_name_display, top_n=10):
         songs_table.add_column("Số lần nghe", width=11, justify="right")
         songs_table.add_column("Thời gian nghe" , width=25, justify="right")
 
-        for i, (full_song_name, row) in enumerate(top_songs.iterrows()):
-            song_name_part = "Không rõ"
-            artist_name_part = "Không rõ"
-
-            if isinstance(full_song_name, str):
-                parts = full_song_name.rsplit(" - ", 1)
-                song_name_part = parts[0]
-                if len(parts) > 1:
-                    artist_name_part = parts[1]
-                else:
-                    artist_name_part = "Không xác định"
-
-            if len(song_name_part) > 30:
-                song_name_for_display = song_name_part[:27] + "..."
+        max_song_name_len = 30
+        play_counts = top_songs['Số lần nghe'].tolist()
+        time_played_strs = format_ms_series_to_detailed_play_time_strings(top_songs['Tổng thời gian nghe (ms)']).tolist()
+        for i, ((song_name_part, artist_name_part), play_count, time_played_str) in enumerate(
+                zip(top_songs.index, play_counts, time_played_strs), start=1):
+            song_name_part = str(song_name_part)
+            if pd.isna(artist_name_part):
+                artist_name_part = "Không xác định"
+
+            if len(song_name_part) > max_song_name_len:
+                song_name_for_display = song_name_part[:max_song_name_len - 3] + "..."
             else:
                 song_name_for_display = song_name_part
 
-            play_count = row['Số lần nghe']
-            time_played_str = format_ms_to_detailed_play_time_string(row['Tổng thời gian nghe (ms)'])
-            songs_table.add_row(str(i+1), song_name_for_display, artist_name_part, str(play_count), time_played_str)
+            songs_table.add_row(str(i), song_name_for_display, artist_name_part, str(play_count), time_played_str)
         console.print(songs_table)
     else:
         console.print("  🤷 Không có dữ liệu top bài hát cho giai đoạn này.", style="yellow")
 
-    top_artists = calculate_top_artists_data(df_period_songs, top_n=top_n)
+    if top_artists is None:
+        top_artists = calculate_top_artists_data(df_period_songs, top_n=top_n)
+    else:
+        top_artists = top_artists.head(top_n)
     if not top_artists.empty:
         artists_table = Table(show_lines=False, header_style="blue")
         artists_table.add_column("STT", style="dim", width=3, justify="right")
@@ -340,10 +445,11 @@ def display_analysis_results(df_period_songs, period_name_display, top_n=10):
         artists_table.add_column("Số lần nghe",width=11, justify="right")
         artists_table.add_column("Thời gian nghe", width=25, justify="right")
 
-        for i, (artist_name, row) in enumerate(top_artists.iterrows()):
-            play_count = row['Số lần nghe']
-            time_played_str = format_ms_to_detailed_play_time_string(row['Tổng thời gian nghe (ms)'])
-            artists_table.add_row(str(i+1), str(artist_name), str(play_count), time_played_str)
+        play_counts = top_artists['Số lần nghe'].tolist()
+        time_played_strs = format_ms_series_to_detailed_play_time_strings(top_artists['Tổng thời gian nghe (ms)']).tolist()
+        for i, (artist_name, play_count, time_played_str) in enumerate(
+                zip(top_artists.index, play_counts, time_played_strs), start=1):
+            artists_table.add_row(str(i), str(artist_name), str(play_count), time_played_str)
         console.print(artists_table)
     else:
         console.print("| 🤷 Không có dữ liệu top nghệ sĩ cho giai đoạn này.", style="yellow")
@@ -352,7 +458,7 @@ def prepare_songs_df_for_excel(top_songs_df_calculated):
     """Chuẩn bị DataFrame top bài hát cho việc xuất ra tệp Excel.
 
     Hàm này nhận DataFrame kết quả từ `calculate_top_songs_data`,
-    tách cột 'fullSongName' (index) thành hai cột mới 'Tên bài hát' và 'Nghệ sĩ'.
+    chuyển MultiIndex (`TRACK_NAME_COL`, `ARTIST_NAME_COL`) thành hai cột 'Tên bài hát' và 'Nghệ sĩ'.
     Đồng thời, định dạng lại cột 'Tổng thời gian nghe (ms)' thành chuỗi thời gian dễ đọc.
 
     Args:
@@ -367,13 +473,11 @@ def prepare_songs_df_for_excel(top_songs_df_calculated):
     if top_songs_df_calculated.empty:
         return pd.DataFrame(columns=['Tên bài hát', 'Nghệ sĩ', 'Số lần nghe', 'Thời gian nghe'])
 
-    df_excel = top_songs_df_calculated.reset_index().rename(columns={'index': 'fullSongName'})
+    df_excel = top_songs_df_calculated.reset_index()
+    df_excel['Tên bài hát'] = df_excel[TRACK_NAME_COL].astype(object)
+    df_excel['Nghệ sĩ'] = df_excel[ARTIST_NAME_COL].astype(object).fillna("Không xác định")
 
-    split_names = df_excel['fullSongName'].astype(str).str.rsplit(' - ', n=1, expand=True)
-    df_excel['Tên bài hát'] = split_names[0]
-    df_excel['Nghệ sĩ'] = split_names[1].fillna("Không xác định") if 1 in split_names else "Không xác định"
-
-    df_excel['Thời gian nghe'] = df_excel['Tổng thời gian nghe (ms)'].apply(format_ms_to_detailed_play_time_string)
+    df_excel['Thời gian nghe'] = format_ms_series_to_detailed_play_time_strings(df_excel['Tổng thời gian nghe (ms)'])
 
     return df_excel[['Tên bài hát', 'Nghệ sĩ', 'Số lần nghe', 'Thời gian nghe']]
 
@@ -398,98 +502,157 @@ def prepare_artists_df_for_excel(top_artists_df_calculated):
         return pd.DataFrame(columns=['Nghệ sĩ', 'Số lần nghe bài hát', 'Tổng thời gian nghe'])
 
     df_excel = top_artists_df_calculated.reset_index().rename(columns={'index': ARTIST_NAME_COL})
-    df_excel['Tổng thời gian nghe'] = df_excel['Tổng thời gian nghe (ms)'].apply(format_ms_to_detailed_play_time_string)
+    df_excel['Tổng thời gian nghe'] = format_ms_series_to_detailed_play_time_strings(df_excel['Tổng thời gian nghe (ms)'])
 
     return df_excel.rename(columns={
         ARTIST_NAME_COL: 'Nghệ sĩ',
         'Số lần nghe': 'Số lần nghe bài hát'
     })[['Nghệ sĩ', 'Số lần nghe bài hát', 'Tổng thời gian nghe']]
 
+def write_excel_cell(worksheet, row, column, value):
+    """Ghi một giá trị vào một ô của worksheet, dùng được cho cả engine openpyxl và xlsxwriter.
+
+    Args:
+        worksheet: Worksheet lấy từ `writer.sheets` của `pd.ExcelWriter`.
+        row (int): Số thứ tự dòng, bắt đầu từ 1 (giống openpyxl).
+        column (int): Số thứ tự cột, bắt đầu từ 1 (giống openpyxl).
+        value (any): Giá trị cần ghi.
+    """
+    if hasattr(worksheet, 'set_column'):
+        worksheet.write(row - 1, column - 1, value)
+    else:
+        worksheet.cell(row=row, column=column, value=value)
+
+def track_excel_column_lengths(max_lengths, df=None, title=None):
+    """Cập nhật độ dài chuỗi lớn nhất của từng cột trước khi ghi dữ liệu ra Excel.
+
+    Độ rộng cột được tính từ chính các DataFrame sẽ ghi ra thay vì đọc lại
+    toàn bộ ô của worksheet sau khi ghi.
+
+    Args:
+        max_lengths (dict): Dictionary {chỉ số cột (từ 0): độ dài lớn nhất}, được cập nhật tại chỗ.
+        df (pd.DataFrame, optional): DataFrame sẽ được ghi (tính cả tên cột).
+        title (str, optional): Tiêu đề sẽ được ghi ở cột đầu tiên.
+    """
+    if title is not None:
+        max_lengths[0] = max(max_lengths.get(0, 0), len(str(title)))
+    if df is not None:
+        for col_idx, column in enumerate(df.columns):
+            lengths = [len(str(value)) for value in df[column].tolist() if pd.notna(value)]
+            lengths.append(len(str(column)))
+            max_lengths[col_idx] = max(max_lengths.get(col_idx, 0), max(lengths))
+
+def set_excel_column_widths(worksheet, max_lengths):
+    """Đặt độ rộng cột (độ dài lớn nhất + 2, trong khoảng 10-50) cho worksheet.
+
+    Args:
+        worksheet: Worksheet lấy từ `writer.sheets` (openpyxl hoặc xlsxwriter).
+        max_lengths (dict): Dictionary {chỉ số cột (từ 0): độ dài lớn nhất}.
+    """
+    is_xlsxwriter = hasattr(worksheet, 'set_column')
+    if not is_xlsxwriter:
+        from openpyxl.utils import get_column_letter
+    for col_idx, max_length in max_lengths.items():
+        adjusted_width = min(max(max_length + 2, 10), 50)
+        if is_xlsxwriter:
+            worksheet.set_column(col_idx, col_idx, adjusted_width)
+        else:
+            worksheet.column_dimensions[get_column_letter(col_idx + 1)].width = adjusted_width
+
 all_songs_df_base = pd.DataFrame()
 
-def export_to_excel(yearly_data_dict, filename="spotify_analysis_report.xlsx", top_n_excel=20):
+def export_to_excel(yearly_top_data, filename="spotify_analysis_report.xlsx", top_n_excel=20, all_top_songs=None, all_top_artists=None):
     """Xuất dữ liệu phân tích Spotify ra tệp Excel.
 
     Tạo một tệp Excel với nhiều sheet:
     - Một sheet "Tất cả": Chứa top `top_n_excel` bài hát và nghệ sĩ từ toàn bộ dữ liệu.
-      Dữ liệu này được lấy từ biến global `all_songs_df_base`.
-    - Mỗi năm có dữ liệu trong `yearly_data_dict`: Một sheet riêng (ví dụ: "2023")
+      Dữ liệu này được lấy từ `all_top_songs`/`all_top_artists` nếu đã tính sẵn,
+      nếu không sẽ tính từ biến global `all_songs_df_base`.
+    - Mỗi năm có dữ liệu trong `yearly_top_data`: Một sheet riêng (ví dụ: "2023")
       chứa top `top_n_excel` bài hát và nghệ sĩ của năm đó.
 
     Hàm sẽ tự động điều chỉnh độ rộng các cột trong Excel để dễ đọc hơn.
-    Yêu cầu thư viện `openpyxl` phải được cài đặt.
+    Dùng engine `xlsxwriter` nếu đã được cài đặt (nhanh hơn), nếu không sẽ dùng `openpyxl`.
 
     Args:
-        yearly_data_dict (dict): Dictionary trong đó key là năm (int hoặc str) và value là
-                                 DataFrame chứa dữ liệu bài hát của năm đó.
+        yearly_top_data (dict): Dictionary trong đó key là năm (int hoặc str) và value là
+                                tuple (top bài hát, top nghệ sĩ) của năm đó,
+                                thường là kết quả từ `calculate_yearly_top_data`.
         filename (str, optional): Tên của tệp Excel đầu ra.
                                   Mặc định là "spotify_analysis_report.xlsx".
         top_n_excel (int, optional): Số lượng mục (bài hát/nghệ sĩ) hàng đầu
                                      để xuất ra mỗi sheet Excel. Mặc định là 20.
+        all_top_songs (pd.DataFrame, optional): Top bài hát của toàn bộ dữ liệu đã tính sẵn.
+        all_top_artists (pd.DataFrame, optional): Top nghệ sĩ của toàn bộ dữ liệu đã tính sẵn.
     """
     global all_songs_df_base
     console.print(f"\n📚 [bold green]Xuất ra EXCEL[/bold green]")
     try:
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+        with pd.ExcelWriter(filename, engine=EXCEL_ENGINE) as writer:
+            column_lengths = {}
             start_row_artists = 1
             if not all_songs_df_base.empty:
-                all_songs_excel_data = calculate_top_songs_data(all_songs_df_base, top_n=top_n_excel)
+                column_lengths["Tất cả"] = {}
+                all_songs_excel_data = all_top_songs if all_top_songs is not None else calculate_top_songs_data(all_songs_df_base, top_n=top_n_excel)
                 if not all_songs_excel_data.empty:
                     excel_all_songs = prepare_songs_df_for_excel(all_songs_excel_data)
                     excel_all_songs.to_excel(writer, sheet_name="Tất cả", index=False, startrow=1)
                     worksheet = writer.sheets["Tất cả"]
-                    worksheet.cell(row=1, column=1, value=f"Top {top_n_excel} Bài Hát (Tất cả)")
+                    songs_title = f"Top {top_n_excel} Bài Hát (Tất cả)"
+                    artists_title = f"Top {top_n_excel} Nghệ Sĩ (Tất cả)"
+                    write_excel_cell(worksheet, 1, 1, songs_title)
                     start_row_artists = len(excel_all_songs) + 4
-                    worksheet.cell(row=start_row_artists -1 , column=1, value=f"Top {top_n_excel} Nghệ Sĩ (Tất cả)")
+                    write_excel_cell(worksheet, start_row_artists - 1, 1, artists_title)
+                    track_excel_column_lengths(column_lengths["Tất cả"], excel_all_songs, songs_title)
+                    track_excel_column_lengths(column_lengths["Tất cả"], title=artists_title)
 
-                all_artists_excel_data = calculate_top_artists_data(all_songs_df_base, top_n=top_n_excel)
+                all_artists_excel_data = all_top_artists if all_top_artists is not None else calculate_top_artists_data(all_songs_df_base, top_n=top_n_excel)
                 if not all_artists_excel_data.empty:
                     excel_all_artists = prepare_artists_df_for_excel(all_artists_excel_data)
                     excel_all_artists.to_excel(writer, sheet_name="Tất cả", index=False, startrow=start_row_artists)
+                    track_excel_column_lengths(column_lengths["Tất cả"], excel_all_artists)
                     if start_row_artists == 1:
                         worksheet = writer.sheets["Tất cả"]
-                        worksheet.cell(row=1, column=1, value=f"Top {top_n_excel} Nghệ Sĩ (Tất cả)")
+                        artists_title = f"Top {top_n_excel} Nghệ Sĩ (Tất cả)"
+                        write_excel_cell(worksheet, 1, 1, artists_title)
+                        track_excel_column_lengths(column_lengths["Tất cả"], title=artists_title)
 
-            for year, df_year_songs in yearly_data_dict.items():
-                if df_year_songs.empty:
+            for year, (year_top_songs_data, year_top_artists_data) in yearly_top_data.items():
+                if year_top_songs_data.empty and year_top_artists_data.empty:
                     continue
                 sheet_name = str(year)
+                column_lengths[sheet_name] = {}
                 start_row_artists_year = 1
 
-                year_top_songs_data = calculate_top_songs_data(df_year_songs, top_n=top_n_excel)
                 if not year_top_songs_data.empty:
                     excel_year_songs = prepare_songs_df_for_excel(year_top_songs_data)
                     excel_year_songs.to_excel(writer, sheet_name=sheet_name, index=False, startrow=1)
                     worksheet = writer.sheets[sheet_name]
-                    worksheet.cell(row=1, column=1, value=f"Top {top_n_excel} Bài Hát (Năm {year})")
+                    songs_title = f"Top {top_n_excel} Bài Hát (Năm {year})"
+                    artists_title = f"Top {top_n_excel} Nghệ Sĩ (Năm {year})"
+                    write_excel_cell(worksheet, 1, 1, songs_title)
                     start_row_artists_year = len(excel_year_songs) + 4
-                    worksheet.cell(row=start_row_artists_year -1 , column=1, value=f"Top {top_n_excel} Nghệ Sĩ (Năm {year})")
+                    write_excel_cell(worksheet, start_row_artists_year - 1, 1, artists_title)
+                    track_excel_column_lengths(column_lengths[sheet_name], excel_year_songs, songs_title)
+                    track_excel_column_lengths(column_lengths[sheet_name], title=artists_title)
 
-                year_top_artists_data = calculate_top_artists_data(df_year_songs, top_n=top_n_excel)
                 if not year_top_artists_data.empty:
                     excel_year_artists = prepare_artists_df_for_excel(year_top_artists_data)
                     excel_year_artists.to_excel(writer, sheet_name=sheet_name, index=False, startrow=start_row_artists_year)
+                    track_excel_column_lengths(column_lengths[sheet_name], excel_year_artists)
                     if start_row_artists_year == 1:
                         worksheet = writer.sheets[sheet_name]
-                        worksheet.cell(row=1, column=1, value=f"Top {top_n_excel} Nghệ Sĩ (Năm {year})")
-
-            for sheet_name_iter in writer.sheets:
-                worksheet = writer.sheets[sheet_name_iter]
-                for column_cells in worksheet.columns:
-                    max_length = 0
-                    column_letter = column_cells[0].column_letter
-                    for cell in column_cells:
-                        try:
-                            if cell.value is not None:
-                                max_length = max(max_length, len(str(cell.value)))
-                        except:
-                            pass
-                    adjusted_width = min(max(max_length + 2, 10), 50)
-                    worksheet.column_dimensions[column_letter].width = adjusted_width
+                        artists_title = f"Top {top_n_excel} Nghệ Sĩ (Năm {year})"
+                        write_excel_cell(worksheet, 1, 1, artists_title)
+                        track_excel_column_lengths(column_lengths[sheet_name], title=artists_title)
+
+            for sheet_name_iter, max_lengths in column_lengths.items():
+                if sheet_name_iter in writer.sheets:
+                    set_excel_column_widths(writer.sheets[sheet_name_iter], max_lengths)
 
         console.print(f"| ✅ Dữ liệu đã được xuất thành công vào '[cyan]{filename}[/cyan]'")
     except ImportError:
-        console.print("| ❌ Lỗi: Thư viện 'openpyxl' chưa được cài đặt. Hãy chạy: pip install openpyxl", style="red")
+        console.print(f"| ❌ Lỗi: Thư viện '{EXCEL_ENGINE}' chưa được cài đặt. Hãy chạy: pip install {EXCEL_ENGINE}", style="red")
     except Exception as e:
         console.print(f"| ❌ Lỗi khi xuất file Excel: {e}", style="red")
 
@@ -500,11 +663,14 @@ def main():
     Các bước chính bao gồm:
     1. Tải dữ liệu từ tệp ZIP chứa lịch sử nghe nhạc Spotify.
     2. Tiền xử lý dữ liệu để chuẩn hóa và lọc ra các bản nhạc hợp lệ.
-    3. Lưu trữ bản sao của DataFrame bài hát đã xử lý vào biến global `all_songs_df_base`.
-    4. Tạo menu cho phép người dùng chọn xem phân tích cho "Tất cả thời gian" hoặc một năm cụ thể.
-    5. Dựa trên lựa chọn của người dùng, thực hiện phân tích và hiển thị kết quả
+    3. Lưu DataFrame bài hát đã xử lý vào biến global `all_songs_df_base` (không sao chép,
+       vì không có bước nào sửa đổi DataFrame này).
+    4. Tính top bài hát/nghệ sĩ của toàn bộ dữ liệu và của từng năm một lần,
+       dùng chung cho console và Excel.
+    5. Tạo menu cho phép người dùng chọn xem phân tích cho "Tất cả thời gian" hoặc một năm cụ thể.
+    6. Dựa trên lựa chọn của người dùng, thực hiện phân tích và hiển thị kết quả
        (thống kê chung, top bài hát, top nghệ sĩ) lên console.
-    6. Chuẩn bị dữ liệu theo năm và xuất toàn bộ báo cáo phân tích ra tệp Excel.
+    7. Xuất toàn bộ báo cáo phân tích ra tệp Excel.
     """
     global all_songs_df_base
 
@@ -521,9 +687,13 @@ def main():
         console.print(f"\n| 🏁 Kết thúc: không có bài hát hợp lệ nào sau tiền xử lý.", style="yellow")
         return
 
-    all_songs_df_base = df_songs.copy()
+    all_songs_df_base = df_songs
+    top_n_excel = 20
+    all_top_songs = calculate_top_songs_data(df_songs, top_n=top_n_excel)
+    all_top_artists = calculate_top_artists_data(df_songs, top_n=top_n_excel)
+    yearly_top_data = calculate_yearly_top_data(df_songs, top_n=top_n_excel)
 
-    available_years = sorted(df_songs['year'].unique(), reverse=True)
+    available_years = np.sort(df_songs['year'].unique())[::-1]
 
     menu_display_items = ["🌍 0. Tất cả"]
     numeric_choice_to_data_key = {0: "Tất cả"}
@@ -548,12 +718,15 @@ def main():
             if selected_option == "Tất cả":
                 df_to_analyze = df_songs
                 period_name_display = "Tất Cả Thời Gian"
+                display_analysis_results(df_to_analyze, period_name_display, top_n=10,
+                                         top_songs=all_top_songs, top_artists=all_top_artists)
             else:
                 selected_year = selected_option
                 df_to_analyze = df_songs[df_songs['year'] == selected_year]
                 period_name_display = f"NĂM {selected_year}"
-
-            display_analysis_results(df_to_analyze, period_name_display, top_n=10)
+                year_top_songs, year_top_artists = yearly_top_data.get(selected_year, (None, None))
+                display_analysis_results(df_to_analyze, period_name_display, top_n=10,
+                                         top_songs=year_top_songs, top_artists=year_top_artists)
         else:
             console.print("| ❌ Lựa chọn không hợp lệ (số không có trong menu). Exit", style="red")
             return
@@ -561,13 +734,11 @@ def main():
         console.print("| ❌ Lựa chọn không hợp lệ (không phải là số).Exit", style="red")
         return
 
-    yearly_data_dict_for_export = {}
-    if not df_songs.empty:
-        for year_val in available_years:
-            yearly_data_dict_for_export[year_val] = df_songs[df_songs['year'] == year_val]
+    yearly_top_data_for_export = {year: yearly_top_data[year] for year in available_years if year in yearly_top_data}
 
     if not df_songs.empty:
-        export_to_excel(yearly_data_dict_for_export, top_n_excel=20)
+        export_to_excel(yearly_top_data_for_export, top_n_excel=top_n_excel,
+                        all_top_songs=all_top_songs, all_top_artists=all_top_artists)
     else:
         console.print("| 🤷 Không có dữ liệu bài hát để xuất ra Excel.", style="yellow")
 
@@ -1,28 +1,46 @@
 import json
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import os
 import zipfile
 import fnmatch
+import re
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.text import Text
-import glob
+import argparse
+import importlib.util
+from functools import reduce
+from itertools import chain
+from operator import getitem
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 PROFILE_BASE_PATH = ["Profile", "Profile Info", "ProfileMap"]
-USER_NAME_PATH = PROFILE_BASE_PATH + ["userName"]
-EMAIL_PATH = PROFILE_BASE_PATH + ["emailAddress"]
-PHONE_PATH = PROFILE_BASE_PATH + ["telephoneNumber"]
-BIO_DESC_PATH = PROFILE_BASE_PATH + ["bioDescription"]
-BIRTH_DATE_PATH = PROFILE_BASE_PATH + ["birthDate"]
-LIKES_RECEIVED_PATH = PROFILE_BASE_PATH + ["likesReceived"]
+# Các đường dẫn dưới đây tính từ ProfileMap
+USER_NAME_PATH = ["userName"]
+EMAIL_PATH = ["emailAddress"]
+PHONE_PATH = ["telephoneNumber"]
+BIO_DESC_PATH = ["bioDescription"]
+BIRTH_DATE_PATH = ["birthDate"]
+LIKES_RECEIVED_PATH = ["likesReceived"]
 
 APP_SETTINGS_BASE_PATH = ["App Settings", "Settings", "SettingsMap"]
-APP_LANG_PATH = APP_SETTINGS_BASE_PATH + ["App Language"]
-PRIVATE_ACCOUNT_PATH = APP_SETTINGS_BASE_PATH + ["Private Account"]
-PERSONALIZED_ADS_PATH = APP_SETTINGS_BASE_PATH + ["PersonalizedAds"]
-FYP_KEYWORD_FILTERS_PATH = APP_SETTINGS_BASE_PATH + ["Content Preferences", "Keyword filters for videos in For You feed"]
+# Các đường dẫn dưới đây tính từ SettingsMap
+APP_LANG_PATH = ["App Language"]
+PRIVATE_ACCOUNT_PATH = ["Private Account"]
+PERSONALIZED_ADS_PATH = ["PersonalizedAds"]
+FYP_KEYWORD_FILTERS_PATH = ["Content Preferences", "Keyword filters for videos in For You feed"]
 
 WATCH_HISTORY_PATH = ["Your Activity", "Watch History", "VideoList"]
 LIKE_LIST_PATH = ["Your Activity", "Like List", "ItemFavoriteList"]
@@ -48,7 +66,84 @@ OFF_TIKTOK_ACTIVITY_PATH = ["Ads and data", "Off TikTok Activity", "OffTikTokAct
 
 DM_CHAT_HISTORY_PATH = ["Direct Message", "Direct Messages", "ChatHistory"]
 
-ZIP_FILE_PATTERN = "./data/TikTok_Data_*.zip"
+# Các dòng của từng bảng hiển thị: (nhãn, khóa trong insights, giá trị mặc định)
+PROFILE_ROWS = [
+    ("Tên người dùng", "Username", "N/A"),
+    ("Email", "Email", "N/A"),
+    ("Số điện thoại", "Phone Number", "N/A"),
+    ("Tiểu sử", "Bio Description", "N/A"),
+    ("Ngày sinh", "Birth Date", "N/A"),
+    ("Lượt thích đã nhận", "Likes Received", 0),
+]
+ACTIVITY_ROWS = [
+    ("Video đã xem", "Videos Watched Count", 0),
+    ("Video đã thích", "Liked Videos Count", 0),
+    ("Bình luận đã đăng", "Comments Made Count", 0),
+    ("Lượt tìm kiếm", "Searches Made Count", 0),
+    ("Lượt chia sẻ", "Shares Made Count", 0),
+    ("Phiên đăng nhập", "Login Sessions Count", 0),
+    ("Người theo dõi", "Followers Count", 0),
+    ("Đang theo dõi", "Following Count", 0),
+    ("Video yêu thích", "Favorite Videos Count", 0),
+    ("Âm thanh yêu thích", "Favorite Sounds Count", 0),
+    ("Người dùng bị chặn", "Blocked Users Count", 0),
+]
+DM_ROWS = [
+    ("Số cuộc trò chuyện", "DM Chats Count", 0),
+    ("Tổng số tin nhắn", "DM Total Messages Count", 0),
+]
+SHOP_ROWS = [
+    ("Đơn hàng đã đặt", "Shop Orders Count", 0),
+    ("Lượt xem sản phẩm", "Shop Product Browsing Count", 0),
+    ("Sản phẩm trong giỏ hàng", "Shop Shopping Cart Items Count", 0),
+    ("Địa chỉ đã lưu", "Shop Saved Addresses Count", 0),
+    ("Thẻ thanh toán đã lưu", "Shop Saved Payment Cards Count", 0),
+]
+LIVE_ROWS = [
+    ("Live đã xem", "Live Sessions Watched Count", 0),
+    ("Bình luận trong Live", "Live Comments Made Count", 0),
+]
+OTHER_ROWS = [
+    ("Ngôn ngữ ứng dụng", "App Language", "N/A"),
+    ("Tài khoản riêng tư", "Private Account", "N/A"),
+    ("Quảng cáo cá nhân hoá", "Personalized Ads", "N/A"),
+    ("Bộ lọc từ khoá FYP", "FYP Keyword Filters Count", 0),
+    ("Sự kiện hoạt động Off-TikTok", "Off-TikTok Activity Events Count", 0),
+]
+
+# Các bảng hiển thị trên console: (tiêu đề, tên cột giá trị, các dòng)
+INSIGHT_TABLES = [
+    ("| 👤 Thông Tin Cá Nhân", "Giá trị", PROFILE_ROWS),
+    ("| 🚀 Hoạt Động Chính", "Số lượng", ACTIVITY_ROWS),
+    ("| 💬 Tin Nhắn Trực Tiếp (DM)", "Số lượng", DM_ROWS),
+    ("| 🛍️  TikTok Shop", "Số lượng", SHOP_ROWS),
+    ("| 🔴 TikTok Live", "Số lượng", LIVE_ROWS),
+    ("| ⚙️  Cài Đặt & Dữ Liệu Khác", "Giá trị / Số lượng", OTHER_ROWS),
+]
+
+# Các nhánh dữ liệu mà chương trình thực sự dùng (phân tích + xuất Excel).
+# Với `--low-memory` (cần `ijson`), chỉ các nhánh này được dựng thành đối tượng Python.
+WANTED_PATHS = [
+    PROFILE_BASE_PATH, APP_SETTINGS_BASE_PATH,
+    WATCH_HISTORY_PATH, LIKE_LIST_PATH, COMMENT_LIST_PATH, SEARCH_LIST_PATH, SHARE_HISTORY_PATH,
+    LOGIN_HISTORY_PATH, FOLLOWER_LIST_PATH, FOLLOWING_LIST_PATH, FAVORITE_VIDEOS_PATH,
+    FAVORITE_SOUNDS_PATH, BLOCKED_USERS_PATH,
+    ORDER_HISTORY_PATH, PRODUCT_BROWSING_PATH, SHOPPING_CART_PATH, SAVED_ADDRESSES_PATH, SAVED_PAYMENT_CARDS_PATH,
+    WATCH_LIVE_HISTORY_PATH, OFF_TIKTOK_ACTIVITY_PATH, DM_CHAT_HISTORY_PATH,
+]
+
+# Các nhánh vẫn được dựng đầy đủ ở chế độ --insights-only; các phần khác chỉ được đếm.
+INSIGHTS_ONLY_BUILT_PATHS = [PROFILE_BASE_PATH, APP_SETTINGS_BASE_PATH, WATCH_LIVE_HISTORY_PATH]
+
+ZIP_DATA_DIR = "./data"
+ZIP_FILE_PREFIX = "TikTok_Data_"
+ZIP_FILE_SUFFIX = ".zip"
+ZIP_FILE_PATTERN = f"{ZIP_DATA_DIR}/{ZIP_FILE_PREFIX}*{ZIP_FILE_SUFFIX}"
+EXCEL_ENGINE = 'xlsxwriter' if importlib.util.find_spec('xlsxwriter') else 'openpyxl'
+PREFERRED_DATA_FILES = ('user_data_tiktok.json', 'user_data.json')
+
+# Bộ nhớ đệm: mẫu glob (chữ thường) -> biểu thức chính quy đã biên dịch
+MEMBER_NAME_PATTERN_CACHE = {}
 
 console = Console()
 
@@ -58,7 +153,8 @@ def safe_get_data(data_dict, path_list, default=None):
 
     Hàm này duyệt qua một từ điển theo một danh sách các khóa (keys) được cung cấp.
     Nếu bất kỳ khóa nào trong đường dẫn không tồn tại, hàm sẽ trả về giá trị mặc định
-    thay vì gây ra lỗi `KeyError`.
+    thay vì gây ra lỗi `KeyError`. Việc duyệt dùng `functools.reduce` với `operator.getitem`
+    (vòng lặp ở tầng C) và bắt lỗi một lần, thay vì kiểm tra `isinstance` ở từng cấp.
 
     Args:
         data_dict (dict): Từ điển nguồn chứa dữ liệu.
@@ -71,56 +167,207 @@ def safe_get_data(data_dict, path_list, default=None):
         any: Giá trị được tìm thấy tại đường dẫn chỉ định, hoặc giá trị `default`
              nếu không tìm thấy.
     """
-    temp_dict = data_dict
-    for key in path_list:
-        if isinstance(temp_dict, dict) and key in temp_dict:
-            temp_dict = temp_dict[key]
+    try:
+        value = reduce(getitem, path_list, data_dict)
+    except (KeyError, TypeError, IndexError):
+        return default
+    return value if value is not None else default
+
+def safe_pop_data(data_dict, path_list, default=None):
+    """
+    Lấy và xoá dữ liệu tại một đường dẫn trong từ điển lồng nhau một cách an toàn.
+
+    Giống `safe_get_data`, nhưng khóa cuối cùng bị xoá khỏi từ điển cha, để nhánh
+    dữ liệu có thể được giải phóng ngay khi không còn được dùng.
+
+    Args:
+        data_dict (dict): Từ điển nguồn chứa dữ liệu.
+        path_list (list): Danh sách các khóa (string) để chỉ định đường dẫn đến
+                          dữ liệu cần lấy.
+        default (any, optional): Giá trị sẽ được trả về nếu đường dẫn không hợp lệ
+                                 hoặc giá trị cuối cùng là None. Mặc định là None.
+
+    Returns:
+        any: Giá trị đã được lấy ra, hoặc giá trị `default` nếu không tìm thấy.
+    """
+    try:
+        value = reduce(getitem, path_list[:-1], data_dict).pop(path_list[-1])
+    except (KeyError, TypeError, IndexError, AttributeError):
+        return default
+    return value if value is not None else default
+
+def load_wanted_sections_from_json(file_obj, wanted_paths, on_skipped_event=None):
+    """
+    Đọc dạng luồng (streaming) một tệp JSON và chỉ dựng các nhánh dữ liệu cần thiết.
+
+    Dùng `ijson.parse` để duyệt các sự kiện JSON; chỉ những sự kiện nằm dưới một
+    đường dẫn trong `wanted_paths` mới được đưa vào `ijson.ObjectBuilder`. Các nhánh
+    khác (ví dụ: danh sách video đã đăng) bị bỏ qua mà không tạo đối tượng Python nào,
+    giúp giảm đáng kể bộ nhớ đỉnh với các tệp xuất dữ liệu lớn.
+
+    Args:
+        file_obj (file-like): Tệp JSON mở ở chế độ nhị phân.
+        wanted_paths (list): Danh sách các đường dẫn (list các khóa) cần giữ lại.
+        on_skipped_event (callable, optional): Hàm `(prefix, event, value)` được gọi
+            cho mỗi sự kiện nằm ngoài các nhánh được giữ lại. Mặc định là None.
+
+    Returns:
+        dict: Từ điển lồng nhau chỉ chứa các nhánh trong `wanted_paths` có mặt trong tệp.
+    """
+    wanted = {".".join(path): path for path in wanted_paths}
+    result = {}
+    builder = None
+    building_prefix = None
+
+    def store(path, value):
+        node = result
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+
+    for prefix, event, value in ijson.parse(file_obj, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == building_prefix and event in ("end_map", "end_array"):
+                store(wanted[building_prefix], builder.value)
+                builder = None
+            continue
+        if prefix in wanted and event not in ("map_key", "end_map", "end_array"):
+            if event in ("start_map", "start_array"):
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+                building_prefix = prefix
+            else:
+                store(wanted[prefix], value)
+        elif on_skipped_event is not None:
+            on_skipped_event(prefix, event, value)
+    return result
+
+def load_section_counts_from_json(file_obj, built_paths=INSIGHTS_ONLY_BUILT_PATHS):
+    """
+    Đọc dạng luồng một tệp JSON, chỉ dựng các nhánh trong `built_paths` và chỉ đếm
+    số phần tử của các phần còn lại.
+
+    Mặc định chỉ hồ sơ, cài đặt và lịch sử Live (cần để lọc bình luận) được dựng đầy đủ;
+    các phần còn lại trong `SECTIONS` (lịch sử xem, tin nhắn, ...) chỉ được đếm
+    mà không tạo bất kỳ phần tử nào, nên bộ nhớ gần như không đổi theo kích thước tệp.
+    Đổi lại, việc đọc dạng luồng chậm hơn nhiều so với `json_loads` trên toàn bộ tệp.
+    Cần thư viện `ijson`.
+
+    Args:
+        file_obj (file-like): Tệp JSON mở ở chế độ nhị phân.
+        built_paths (list, optional): Các nhánh cần dựng đầy đủ.
+            Mặc định là `INSIGHTS_ONLY_BUILT_PATHS`.
+
+    Returns:
+        tuple: (dữ liệu đã dựng, từ điển khóa số lượng trong insights -> số lượng).
+    """
+    built_prefixes = {".".join(path) for path in built_paths}
+    item_prefixes = {}
+    map_prefixes = {}
+    for _, count_key, path, container_type, _ in SECTIONS:
+        prefix = ".".join(path)
+        if prefix in built_prefixes:
+            continue
+        if container_type is list:
+            item_prefixes[prefix + ".item"] = count_key
         else:
-            return default
-    return temp_dict if temp_dict is not None else default
+            map_prefixes[prefix] = count_key
+
+    dm_prefix = ".".join(DM_CHAT_HISTORY_PATH)
+    dm_total_key = DERIVED_COUNTS["DM Chats Count"][0]
+    section_counts = dict.fromkeys([*item_prefixes.values(), *map_prefixes.values(), dm_total_key], 0)
+    item_events = ("start_map", "start_array", "string", "number", "boolean", "null")
+    current_chat_item_prefix = None
+
+    def count_event(prefix, event, value):
+        nonlocal current_chat_item_prefix
+        if event == "map_key":
+            if prefix in map_prefixes:
+                section_counts[map_prefixes[prefix]] += 1
+                if prefix == dm_prefix:
+                    current_chat_item_prefix = f"{dm_prefix}.{value}.item"
+        elif event in item_events:
+            if prefix in item_prefixes:
+                section_counts[item_prefixes[prefix]] += 1
+            elif prefix == current_chat_item_prefix:
+                section_counts[dm_total_key] += 1
+
+    data = load_wanted_sections_from_json(file_obj, built_paths, on_skipped_event=count_event)
+    return data, section_counts
+
+def compile_member_name_pattern(internal_file_pattern):
+    """
+    Biên dịch mẫu glob tên tệp (không phân biệt hoa thường) thành biểu thức chính quy,
+    dùng lại kết quả đã biên dịch cho các lần gọi sau.
+
+    Args:
+        internal_file_pattern (str): Mẫu glob, ví dụ "user_data*.json".
 
-def load_tiktok_data_from_zip(zip_file_path, internal_file_pattern="user_data*.json"):
+    Returns:
+        re.Pattern: Biểu thức chính quy để so khớp với tên tệp viết thường.
     """
-    Tải và phân tích cú pháp (parse) tệp JSON dữ liệu người dùng từ tệp ZIP của TikTok.
+    pattern_key = internal_file_pattern.lower()
+    name_pattern = MEMBER_NAME_PATTERN_CACHE.get(pattern_key)
+    if name_pattern is None:
+        name_pattern = MEMBER_NAME_PATTERN_CACHE[pattern_key] = re.compile(fnmatch.translate(pattern_key))
+    return name_pattern
 
-    Hàm này mở một tệp ZIP, tìm kiếm tệp JSON dữ liệu người dùng (ví dụ: user_data.json)
-    bên trong, đọc nội dung và chuyển đổi nó thành một đối tượng từ điển Python.
-    Nó cũng xử lý các lỗi phổ biến như không tìm thấy tệp, tệp ZIP hỏng,
-    hoặc lỗi giải mã JSON.
+def read_tiktok_data_file(zip_file_path, internal_file_pattern, reader):
+    """
+    Tìm tệp JSON dữ liệu người dùng trong tệp ZIP của TikTok và đọc nó bằng `reader`.
+
+    Tệp `user_data_tiktok.json` / `user_data.json` được ưu tiên; nếu không có,
+    tệp JSON đầu tiên khớp với `internal_file_pattern` sẽ được dùng. Hàm này xử lý
+    các lỗi phổ biến như không tìm thấy tệp, tệp ZIP hỏng, hoặc lỗi giải mã JSON.
 
     Args:
         zip_file_path (str): Đường dẫn đến tệp ZIP chứa dữ liệu TikTok.
-        internal_file_pattern (str, optional): Mẫu tên tệp để tìm kiếm tệp JSON
-            bên trong tệp ZIP. Mặc định là "user_data*.json".
+        internal_file_pattern (str): Mẫu tên tệp để tìm kiếm tệp JSON bên trong tệp ZIP.
+        reader (callable): Hàm `(zf, tên tệp)` đọc và trả về nội dung đã phân tích.
 
     Returns:
-        dict | None: Một từ điển chứa toàn bộ dữ liệu người dùng nếu tải thành công.
-                      Trả về None nếu có lỗi xảy ra.
+        any | None: Kết quả của `reader`, hoặc None nếu có lỗi xảy ra.
     """
-    all_data = None
     try:
         with zipfile.ZipFile(zip_file_path, 'r') as zf:
-            json_files_in_zip = [
-                name for name in zf.namelist()
-                if fnmatch.fnmatch(os.path.basename(name).lower(), internal_file_pattern.lower()) and name.endswith(".json")
-            ]
-
-            if not json_files_in_zip:
-                console.print(f"| 🚫 Không tìm thấy tệp JSON nào khớp với mẫu '[yellow]{internal_file_pattern}[/yellow]' trong '[cyan]{zip_file_path}[/cyan]'.")
-                console.print(f"| ℹ️ Các tệp có trong ZIP: {zf.namelist()}")
-                return None
-            
-            preferred_files = [f for f in json_files_in_zip if os.path.basename(f).lower() in ('user_data_tiktok.json', 'user_data.json')]
-            if preferred_files:
-                 file_to_load = preferred_files[0]
-            else:
-                 file_to_load = json_files_in_zip[0] 
+            name_pattern = compile_member_name_pattern(internal_file_pattern)
+            file_to_load = None
+            for preferred_name in PREFERRED_DATA_FILES:
+                if not name_pattern.match(preferred_name):
+                    continue
+                try:
+                    file_to_load = zf.getinfo(preferred_name).filename
+                    break
+                except KeyError:
+                    pass
+
+            if file_to_load is None:
+                first_match = None
+                for zip_info in zf.infolist():
+                    name = zip_info.filename
+                    if not name.endswith(".json"):
+                        continue
+                    base_name = name.rsplit("/", 1)[-1].lower()
+                    if not name_pattern.match(base_name):
+                        continue
+                    if base_name in PREFERRED_DATA_FILES:
+                        file_to_load = name
+                        break
+                    if first_match is None:
+                        first_match = name
+
+                if file_to_load is None:
+                    file_to_load = first_match
+
+                if file_to_load is None:
+                    console.print(f"| 🚫 Không tìm thấy tệp JSON nào khớp với mẫu '[yellow]{internal_file_pattern}[/yellow]' trong '[cyan]{zip_file_path}[/cyan]'.")
+                    console.print(f"| ℹ️ Các tệp có trong ZIP: {zf.namelist()}")
+                    return None
 
             console.print(f"| 📄 Tìm thấy và đang tải tệp: [cyan]{file_to_load}[/cyan]")
             try:
-                with zf.open(file_to_load) as f:
-                    file_content = f.read().decode('utf-8')
-                    all_data = json.loads(file_content)
+                return reader(zf, file_to_load)
             except json.JSONDecodeError as e_json:
                 console.print(f"| ❌ Lỗi giải mã JSON từ tệp '[yellow]{file_to_load}[/yellow]' trong ZIP: {e_json}", style="red")
             except Exception as e_file:
@@ -136,11 +383,234 @@ def load_tiktok_data_from_zip(zip_file_path, internal_file_pattern="user_data*.j
         console.print(f"| ❌ Lỗi không xác định khi xử lý tệp ZIP: {e_zip}", style="red")
         return None
 
+    return None
+
+def load_tiktok_data_from_zip(zip_file_path, internal_file_pattern="user_data*.json", wanted_paths=None):
+    """
+    Tải và phân tích cú pháp (parse) tệp JSON dữ liệu người dùng từ tệp ZIP của TikTok.
+
+    Hàm này mở một tệp ZIP, tìm kiếm tệp JSON dữ liệu người dùng (ví dụ: user_data.json)
+    bên trong, đọc nội dung và chuyển đổi nó thành một đối tượng từ điển Python
+    (dùng `orjson` nếu đã được cài đặt, parse trực tiếp từ bytes không cần decode).
+    Nếu truyền `wanted_paths` và thư viện `ijson` đã được cài đặt, tệp sẽ được đọc dạng
+    luồng và chỉ các nhánh cần thiết được giữ lại (xem `load_wanted_sections_from_json`).
+    Cách này tốn ít bộ nhớ hơn nhưng chậm hơn nhiều so với tải toàn bộ tệp.
+
+    Args:
+        zip_file_path (str): Đường dẫn đến tệp ZIP chứa dữ liệu TikTok.
+        internal_file_pattern (str, optional): Mẫu tên tệp để tìm kiếm tệp JSON
+            bên trong tệp ZIP. Mặc định là "user_data*.json".
+        wanted_paths (list, optional): Danh sách các đường dẫn dữ liệu cần giữ lại.
+            Mặc định là None (tải toàn bộ tệp JSON).
+
+    Returns:
+        dict | None: Một từ điển chứa dữ liệu người dùng nếu tải thành công.
+                      Trả về None nếu có lỗi xảy ra.
+    """
+    if wanted_paths is not None and ijson is None:
+        console.print(f"| ℹ️ Chưa cài đặt 'ijson', sẽ tải toàn bộ dữ liệu. Hãy chạy: pip install ijson")
+
+    def reader(zf, file_to_load):
+        if wanted_paths is not None and ijson is not None:
+            with zf.open(file_to_load) as f:
+                return load_wanted_sections_from_json(f, wanted_paths)
+        return json_loads(zf.read(file_to_load))
+
+    all_data = read_tiktok_data_file(zip_file_path, internal_file_pattern, reader)
     if not all_data:
         console.print(f"| ⚠️ Không có dữ liệu nào được tải.", style="yellow")
     return all_data
 
-def extract_tiktok_insights(data):
+def load_tiktok_section_counts_from_zip(zip_file_path, internal_file_pattern="user_data*.json", built_paths=INSIGHTS_ONLY_BUILT_PATHS):
+    """
+    Tải dữ liệu ở chế độ chỉ đếm: chỉ các nhánh trong `built_paths` được dựng đầy đủ
+    (xem `load_section_counts_from_json`).
+
+    Nếu thư viện `ijson` chưa được cài đặt, hàm sẽ tải toàn bộ dữ liệu như bình thường.
+
+    Args:
+        zip_file_path (str): Đường dẫn đến tệp ZIP chứa dữ liệu TikTok.
+        internal_file_pattern (str, optional): Mẫu tên tệp để tìm kiếm tệp JSON
+            bên trong tệp ZIP. Mặc định là "user_data*.json".
+        built_paths (list, optional): Các nhánh cần dựng đầy đủ.
+            Mặc định là `INSIGHTS_ONLY_BUILT_PATHS`.
+
+    Returns:
+        tuple: (dữ liệu, số lượng theo từng phần hoặc None). Trả về (None, None) nếu có lỗi.
+    """
+    if ijson is None:
+        console.print(f"| ℹ️ Chưa cài đặt 'ijson', sẽ tải toàn bộ dữ liệu. Hãy chạy: pip install ijson")
+        return load_tiktok_data_from_zip(zip_file_path, internal_file_pattern), None
+
+    def reader(zf, file_to_load):
+        with zf.open(file_to_load) as f:
+            return load_section_counts_from_json(f, built_paths)
+
+    result = read_tiktok_data_file(zip_file_path, internal_file_pattern, reader)
+    if result is None:
+        console.print(f"| ⚠️ Không có dữ liệu nào được tải.", style="yellow")
+        return None, None
+    return result
+
+def is_valid_live_comment(comment):
+    """
+    Kiểm tra một bình luận trong phiên Live có thực sự chứa dữ liệu hay không.
+
+    Args:
+        comment (dict): Một mục trong danh sách "Comments" của phiên Live.
+
+    Returns:
+        bool: True nếu bình luận có nội dung hoặc có thời gian hợp lệ.
+    """
+    return comment.get("CommentContent", "") != "" or comment.get("RawTime", -1) != -1
+
+def count_live_comments(live_history):
+    """
+    Đếm tổng số bình luận hợp lệ trong tất cả các phiên Live đã xem.
+
+    Args:
+        live_history (dict): Ánh xạ ID phiên Live -> thông tin phiên.
+
+    Returns:
+        int: Tổng số bình luận hợp lệ.
+    """
+    return sum(
+        1
+        for session_data in live_history.values()
+        for c in safe_get_data(session_data, ["Comments"], [])
+        if is_valid_live_comment(c)
+    )
+
+def count_dm_messages(chat_history):
+    """
+    Đếm tổng số tin nhắn trong tất cả các cuộc trò chuyện.
+
+    Args:
+        chat_history (dict): Ánh xạ tên cuộc trò chuyện -> danh sách tin nhắn.
+
+    Returns:
+        int: Tổng số tin nhắn.
+    """
+    return sum(len(messages) for messages in chat_history.values() if isinstance(messages, list))
+
+def order_history_to_records(orders_dict):
+    """
+    Chuyển lịch sử đơn hàng (dạng dict theo mã đơn) thành danh sách bản ghi.
+
+    Args:
+        orders_dict (dict): Ánh xạ mã đơn hàng -> chi tiết đơn hàng.
+
+    Returns:
+        list: Danh sách bản ghi, mỗi bản ghi có thêm cột "order_id_from_key".
+    """
+    return [{**order_details, 'order_id_from_key': order_id} for order_id, order_details in orders_dict.items()]
+
+def live_history_to_records(live_map):
+    """
+    Chuyển lịch sử xem Live thành danh sách bản ghi, gộp các bình luận hợp lệ
+    của mỗi phiên thành một chuỗi.
+
+    Args:
+        live_map (dict): Ánh xạ ID phiên Live -> thông tin phiên.
+
+    Returns:
+        list: Danh sách bản ghi với các cột LiveSessionID, WatchTime, CommentsInLive.
+    """
+    live_list_for_excel = []
+    for live_id, details in live_map.items():
+        entry = {"LiveSessionID": live_id, "WatchTime": details.get("WatchTime")}
+        comments = details.get("Comments", [])
+        valid_comments = [c.get("CommentContent") for c in comments if is_valid_live_comment(c)]
+        entry["CommentsInLive"] = "; ".join(valid_comments) if valid_comments else ""
+        live_list_for_excel.append(entry)
+    return live_list_for_excel
+
+def dm_history_to_frame(dm_history):
+    """
+    Làm phẳng lịch sử tin nhắn thành một DataFrame duy nhất.
+
+    Các tin nhắn được đưa thẳng vào DataFrame (không sao chép từng tin nhắn),
+    sau đó cột "ChatWith" được gán một lần bằng `np.repeat` theo số tin nhắn
+    của mỗi cuộc trò chuyện. Cột mới được chèn ngay sau các cột của tin nhắn đầu tiên;
+    nếu tin nhắn đã có khóa "ChatWith" thì cột đó được ghi đè tại chỗ.
+
+    Args:
+        dm_history (dict): Ánh xạ "Chat History with <tên>:" -> danh sách tin nhắn.
+
+    Returns:
+        pd.DataFrame: DataFrame tin nhắn có thêm cột "ChatWith"
+                      (rỗng nếu không có tin nhắn nào).
+    """
+    chat_names = []
+    chat_lengths = []
+    all_messages = []
+    for chat_with, messages in dm_history.items():
+        if isinstance(messages, list) and messages:
+            chat_names.append(chat_with.replace("Chat History with ", "").replace(":", ""))
+            chat_lengths.append(len(messages))
+            all_messages.extend(messages)
+    if not all_messages:
+        return pd.DataFrame()
+    dm_df = pd.DataFrame(all_messages)
+    chat_with = np.repeat(chat_names, chat_lengths)
+    if "ChatWith" in dm_df.columns:
+        dm_df["ChatWith"] = chat_with
+    else:
+        dm_df.insert(len(all_messages[0]), "ChatWith", chat_with)
+    return dm_df
+
+# Các phần dữ liệu dạng danh sách/từ điển, theo thứ tự trong bảng tổng quan.
+# Mỗi mục: (tên sheet hoặc None nếu chỉ đếm, khóa số lượng trong insights,
+#           đường dẫn, kiểu dữ liệu, hàm chuyển thành bản ghi/DataFrame hoặc None)
+SECTIONS = [
+    ("Watch History", "Videos Watched Count", WATCH_HISTORY_PATH, list, None),
+    ("Liked Videos", "Liked Videos Count", LIKE_LIST_PATH, list, None),
+    ("Comments Made", "Comments Made Count", COMMENT_LIST_PATH, list, None),
+    ("Search History", "Searches Made Count", SEARCH_LIST_PATH, list, None),
+    (None, "Shares Made Count", SHARE_HISTORY_PATH, list, None),
+    ("Login History", "Login Sessions Count", LOGIN_HISTORY_PATH, list, None),
+    ("Followers", "Followers Count", FOLLOWER_LIST_PATH, list, None),
+    ("Following", "Following Count", FOLLOWING_LIST_PATH, list, None),
+    ("Favorite Videos", "Favorite Videos Count", FAVORITE_VIDEOS_PATH, list, None),
+    ("Favorite Sounds", "Favorite Sounds Count", FAVORITE_SOUNDS_PATH, list, None),
+    ("Blocked Users", "Blocked Users Count", BLOCKED_USERS_PATH, list, None),
+    ("Shop Order History", "Shop Orders Count", ORDER_HISTORY_PATH, dict, order_history_to_records),
+    ("Shop Product Browsing", "Shop Product Browsing Count", PRODUCT_BROWSING_PATH, list, None),
+    ("Shop Shopping Cart", "Shop Shopping Cart Items Count", SHOPPING_CART_PATH, list, None),
+    (None, "Shop Saved Addresses Count", SAVED_ADDRESSES_PATH, list, None),
+    (None, "Shop Saved Payment Cards Count", SAVED_PAYMENT_CARDS_PATH, list, None),
+    ("Watch Live History", "Live Sessions Watched Count", WATCH_LIVE_HISTORY_PATH, dict, live_history_to_records),
+    (None, "Off-TikTok Activity Events Count", OFF_TIKTOK_ACTIVITY_PATH, list, None),
+    ("Direct Messages", "DM Chats Count", DM_CHAT_HISTORY_PATH, dict, dm_history_to_frame),
+]
+
+# Các chỉ số phụ tính từ một phần dữ liệu, được ghi ngay sau số lượng của phần đó.
+DERIVED_COUNTS = {
+    "Live Sessions Watched Count": ("Live Comments Made Count", count_live_comments),
+    "DM Chats Count": ("DM Total Messages Count", count_dm_messages),
+}
+
+# Toàn bộ khóa của insights, theo thứ tự trong bảng tổng quan
+INSIGHT_KEYS = (
+    "Username", "Email", "Phone Number", "Bio Description", "Birth Date", "Likes Received",
+    "App Language", "Private Account", "Personalized Ads", "FYP Keyword Filters Count",
+    *(key
+      for _, count_key, _, _, _ in SECTIONS
+      for key in (count_key, *DERIVED_COUNTS.get(count_key, ())[:1])),
+)
+
+# Các sheet chi tiết được xuất mặc định; các sheet lớn chỉ được xuất với --full
+ALL_DETAILED_SHEETS = frozenset(sheet_name for sheet_name, *_ in SECTIONS if sheet_name)
+LARGE_DETAILED_SHEETS = frozenset({"Watch History", "Direct Messages"})
+DETAILED_SHEETS = ALL_DETAILED_SHEETS - LARGE_DETAILED_SHEETS
+
+# Các nhánh được dựng đầy đủ khi chạy mặc định (không có --full); các sheet lớn chỉ được đếm
+DETAILED_BUILT_PATHS = [
+    PROFILE_BASE_PATH, APP_SETTINGS_BASE_PATH,
+    *(path for sheet_name, _, path, _, _ in SECTIONS if sheet_name in DETAILED_SHEETS),
+]
+
+def extract_tiktok_insights(data, section_counts=None):
     """
     Trích xuất và tổng hợp các thông tin chính (insights) từ dữ liệu thô của TikTok.
 
@@ -150,70 +620,92 @@ def extract_tiktok_insights(data):
 
     Args:
         data (dict): Từ điển chứa toàn bộ dữ liệu TikTok đã được tải từ tệp JSON.
+        section_counts (dict, optional): Số lượng đã đếm sẵn theo khóa trong insights
+            (từ `load_section_counts_from_json`). Mặc định là None.
 
     Returns:
         dict: Một từ điển chứa các thông tin và chỉ số chính đã được trích xuất.
-              Trả về từ điển rỗng nếu dữ liệu đầu vào không hợp lệ.
+              Trả về từ điển rỗng nếu không có cả dữ liệu lẫn số lượng đếm sẵn.
     """
-    if not data:
+    if not data and not section_counts:
         return {}
+    data = data or {}
+
+    insights = dict.fromkeys(INSIGHT_KEYS)
+
+    profile_map = safe_get_data(data, PROFILE_BASE_PATH, {})
+    insights["Username"] = safe_get_data(profile_map, USER_NAME_PATH, "N/A")
+    insights["Email"] = safe_get_data(profile_map, EMAIL_PATH, "N/A")
+    insights["Phone Number"] = safe_get_data(profile_map, PHONE_PATH, "N/A")
+    insights["Bio Description"] = safe_get_data(profile_map, BIO_DESC_PATH, "N/A")
+    insights["Birth Date"] = safe_get_data(profile_map, BIRTH_DATE_PATH, "N/A")
+    insights["Likes Received"] = safe_get_data(profile_map, LIKES_RECEIVED_PATH, 0)
+
+    settings_map = safe_get_data(data, APP_SETTINGS_BASE_PATH, {})
+    insights["App Language"] = safe_get_data(settings_map, APP_LANG_PATH, "N/A")
+    insights["Private Account"] = safe_get_data(settings_map, PRIVATE_ACCOUNT_PATH, "N/A")
+    insights["Personalized Ads"] = safe_get_data(settings_map, PERSONALIZED_ADS_PATH, "N/A")
+    fyp_filters = safe_get_data(settings_map, FYP_KEYWORD_FILTERS_PATH, [])
+    insights["FYP Keyword Filters Count"] = len(fyp_filters) if isinstance(fyp_filters, list) else 0
 
-    insights = {}
+    for _, count_key, path, container_type, _ in SECTIONS:
+        if section_counts is not None and count_key in section_counts:
+            insights[count_key] = section_counts[count_key]
+            if count_key in DERIVED_COUNTS:
+                derived_key = DERIVED_COUNTS[count_key][0]
+                insights[derived_key] = section_counts.get(derived_key, 0)
+            continue
+        value = safe_get_data(data, path, container_type())
+        is_valid = isinstance(value, container_type)
+        insights[count_key] = len(value) if is_valid else 0
+        if count_key in DERIVED_COUNTS:
+            derived_key, count_func = DERIVED_COUNTS[count_key]
+            insights[derived_key] = count_func(value) if is_valid else 0
 
-    insights["Username"] = safe_get_data(data, USER_NAME_PATH, "N/A")
-    insights["Email"] = safe_get_data(data, EMAIL_PATH, "N/A")
-    insights["Phone Number"] = safe_get_data(data, PHONE_PATH, "N/A")
-    insights["Bio Description"] = safe_get_data(data, BIO_DESC_PATH, "N/A")
-    insights["Birth Date"] = safe_get_data(data, BIRTH_DATE_PATH, "N/A")
-    insights["Likes Received"] = safe_get_data(data, LIKES_RECEIVED_PATH, 0)
+    return insights
 
-    insights["App Language"] = safe_get_data(data, APP_LANG_PATH, "N/A")
-    insights["Private Account"] = safe_get_data(data, PRIVATE_ACCOUNT_PATH, "N/A")
-    insights["Personalized Ads"] = safe_get_data(data, PERSONALIZED_ADS_PATH, "N/A")
-    fyp_filters = safe_get_data(data, FYP_KEYWORD_FILTERS_PATH, [])
-    insights["FYP Keyword Filters Count"] = len(fyp_filters) if isinstance(fyp_filters, list) else 0
+def add_insight_rows(table, insights, rows):
+    """
+    Thêm các dòng (nhãn, giá trị) vào một bảng `rich` từ từ điển `insights`.
+
+    Args:
+        table (Table): Bảng `rich` cần thêm dòng.
+        insights (dict): Từ điển chứa các thông tin đã được trích xuất.
+        rows (list): Danh sách (nhãn, khóa trong insights, giá trị mặc định).
+                     Giá trị rỗng hoặc thiếu được thay bằng giá trị mặc định.
+    """
+    for label, key, default in rows:
+        value = insights.get(key, default)
+        table.add_row(label, str(value if value not in ("", None) else default))
 
-    insights["Videos Watched Count"] = len(safe_get_data(data, WATCH_HISTORY_PATH, []))
-    insights["Liked Videos Count"] = len(safe_get_data(data, LIKE_LIST_PATH, []))
-    insights["Comments Made Count"] = len(safe_get_data(data, COMMENT_LIST_PATH, []))
-    insights["Searches Made Count"] = len(safe_get_data(data, SEARCH_LIST_PATH, []))
-    insights["Shares Made Count"] = len(safe_get_data(data, SHARE_HISTORY_PATH, []))
-    insights["Login Sessions Count"] = len(safe_get_data(data, LOGIN_HISTORY_PATH, []))
-    insights["Followers Count"] = len(safe_get_data(data, FOLLOWER_LIST_PATH, []))
-    insights["Following Count"] = len(safe_get_data(data, FOLLOWING_LIST_PATH, []))
-    insights["Favorite Videos Count"] = len(safe_get_data(data, FAVORITE_VIDEOS_PATH, []))
-    insights["Favorite Sounds Count"] = len(safe_get_data(data, FAVORITE_SOUNDS_PATH, []))
-    insights["Blocked Users Count"] = len(safe_get_data(data, BLOCKED_USERS_PATH, []))
-
-    orders = safe_get_data(data, ORDER_HISTORY_PATH, {})
-    insights["Shop Orders Count"] = len(orders) if isinstance(orders, dict) else 0
-    insights["Shop Product Browsing Count"] = len(safe_get_data(data, PRODUCT_BROWSING_PATH, []))
-    insights["Shop Shopping Cart Items Count"] = len(safe_get_data(data, SHOPPING_CART_PATH, []))
-    insights["Shop Saved Addresses Count"] = len(safe_get_data(data, SAVED_ADDRESSES_PATH, []))
-    insights["Shop Saved Payment Cards Count"] = len(safe_get_data(data, SAVED_PAYMENT_CARDS_PATH, []))
-
-    live_history = safe_get_data(data, WATCH_LIVE_HISTORY_PATH, {})
-    insights["Live Sessions Watched Count"] = len(live_history) if isinstance(live_history, dict) else 0
-    
-    total_live_comments = 0
-    if isinstance(live_history, dict):
-        for session_id, session_data in live_history.items():
-            comments = safe_get_data(session_data, ["Comments"], [])
-            valid_comments = [c for c in comments if c.get("CommentContent", "") != "" or c.get("RawTime", -1) != -1]
-            total_live_comments += len(valid_comments)
-    insights["Live Comments Made Count"] = total_live_comments
-
-    insights["Off-TikTok Activity Events Count"] = len(safe_get_data(data, OFF_TIKTOK_ACTIVITY_PATH, []))
-    
-    chat_history = safe_get_data(data, DM_CHAT_HISTORY_PATH, {})
-    insights["DM Chats Count"] = len(chat_history) if isinstance(chat_history, dict) else 0
-    total_dm_messages = 0
-    if isinstance(chat_history, dict):
-        for chat_name, messages in chat_history.items():
-            total_dm_messages += len(messages) if isinstance(messages, list) else 0
-    insights["DM Total Messages Count"] = total_dm_messages
+def build_insight_table(title, value_column, rows, insights, table_width=89, col1_width=35, col2_width=50):
+    """
+    Tạo một bảng `rich` hai cột (mục, giá trị) cho một nhóm thông tin.
 
-    return insights
+    Args:
+        title (str): Tiêu đề bảng.
+        value_column (str): Tên cột giá trị.
+        rows (list): Danh sách (nhãn, khóa trong insights, giá trị mặc định).
+        insights (dict): Từ điển chứa các thông tin đã được trích xuất.
+        table_width (int, optional): Độ rộng bảng. Mặc định là 89.
+        col1_width (int, optional): Độ rộng cột mục. Mặc định là 35.
+        col2_width (int, optional): Độ rộng cột giá trị. Mặc định là 50.
+
+    Returns:
+        Table: Bảng đã được điền dữ liệu.
+    """
+    table = Table(
+        title=title,
+        show_header=False,
+        show_lines=False,
+        title_justify="left",
+        title_style="none",
+        width=table_width
+    )
+    table.add_column("Mục", style="dim", width=col1_width, justify="left")
+    table.add_column(value_column, width=col2_width, justify="right")
+    add_insight_rows(table, insights, rows)
+    return table
 
 def display_insights_rich(insights, username="User"):
     """
@@ -228,130 +720,70 @@ def display_insights_rich(insights, username="User"):
         username (str, optional): Tên người dùng để hiển thị. Mặc định là "User".
     """
     if not insights:
-        console.print(f"| ⚠️ Không có thông tin chi tiết để hiển thị.[/red]")
+        console.print(f"| ⚠️ Không có thông tin chi tiết để hiển thị.", style="yellow")
         return
 
-    table_width = 89
-    col1_width = 35
-    col2_width = 50 
+    for title, value_column, rows in INSIGHT_TABLES:
+        console.print(build_insight_table(title, value_column, rows, insights))
 
-    profile_table = Table(
-        title="| 👤 Thông Tin Cá Nhân",
-        show_header=False,
-        show_lines=False,
-        title_justify="left",
-        title_style="none",
-        width=table_width
-    )
-    profile_table.add_column("Mục", style="dim", width=col1_width, justify="left")
-    profile_table.add_column("Giá trị", width=col2_width, justify="right")
-    profile_table.add_row("Tên người dùng", insights.get("Username", "N/A"))
-    profile_table.add_row("Email", insights.get("Email", "N/A"))
-    profile_table.add_row("Số điện thoại", insights.get("Phone Number", "N/A"))
-    bio = insights.get("Bio Description", "N/A")
-    profile_table.add_row("Tiểu sử", bio if bio else "N/A") 
-    profile_table.add_row("Ngày sinh", insights.get("Birth Date", "N/A"))
-    profile_table.add_row("Lượt thích đã nhận", str(insights.get("Likes Received", 0)))
-    console.print(profile_table)
-
-    activity_table = Table(
-        title="| 🚀 Hoạt Động Chính",
-        show_header=False,
-        show_lines=False,
-        title_justify="left",
-        title_style="none",
-        width=table_width
-    )
-    activity_table.add_column("Mục", style="dim", width=col1_width, justify="left")
-    activity_table.add_column("Số lượng", width=col2_width, justify="right")
-    activity_table.add_row("Video đã xem", str(insights.get("Videos Watched Count", 0)))
-    activity_table.add_row("Video đã thích", str(insights.get("Liked Videos Count", 0)))
-    activity_table.add_row("Bình luận đã đăng", str(insights.get("Comments Made Count", 0)))
-    activity_table.add_row("Lượt tìm kiếm", str(insights.get("Searches Made Count", 0)))
-    activity_table.add_row("Lượt chia sẻ", str(insights.get("Shares Made Count", 0)))
-    activity_table.add_row("Phiên đăng nhập", str(insights.get("Login Sessions Count", 0)))
-    activity_table.add_row("Người theo dõi", str(insights.get("Followers Count", 0)))
-    activity_table.add_row("Đang theo dõi", str(insights.get("Following Count", 0)))
-    activity_table.add_row("Video yêu thích", str(insights.get("Favorite Videos Count", 0)))
-    activity_table.add_row("Âm thanh yêu thích", str(insights.get("Favorite Sounds Count", 0)))
-    activity_table.add_row("Người dùng bị chặn", str(insights.get("Blocked Users Count", 0)))
-    console.print(activity_table)
-    
-    dm_table = Table(
-        title="| 💬 Tin Nhắn Trực Tiếp (DM)",
-        show_header=False,
-        show_lines=False,
-        title_justify="left",
-        title_style="none",
-        width=table_width
-    )
-    dm_table.add_column("Mục", style="dim", width=col1_width, justify="left")
-    dm_table.add_column("Số lượng", width=col2_width, justify="right")
-    dm_table.add_row("Số cuộc trò chuyện", str(insights.get("DM Chats Count",0)))
-    dm_table.add_row("Tổng số tin nhắn", str(insights.get("DM Total Messages Count",0)))
-    console.print(dm_table)
-
-    shop_table = Table(
-        title="| 🛍️  TikTok Shop",
-        show_header=False,
-        show_lines=False,
-        title_justify="left",
-        title_style="none",
-        width=table_width
-    )
-    shop_table.add_column("Mục", style="dim", width=col1_width, justify="left")
-    shop_table.add_column("Số lượng", width=col2_width, justify="right")
-    shop_table.add_row("Đơn hàng đã đặt", str(insights.get("Shop Orders Count", 0)))
-    shop_table.add_row("Lượt xem sản phẩm", str(insights.get("Shop Product Browsing Count", 0)))
-    shop_table.add_row("Sản phẩm trong giỏ hàng", str(insights.get("Shop Shopping Cart Items Count", 0)))
-    shop_table.add_row("Địa chỉ đã lưu", str(insights.get("Shop Saved Addresses Count", 0)))
-    shop_table.add_row("Thẻ thanh toán đã lưu", str(insights.get("Shop Saved Payment Cards Count", 0)))
-    console.print(shop_table)
-
-    live_table = Table(
-        title="| 🔴 TikTok Live",
-        show_header=False,
-        show_lines=False,
-        title_justify="left",
-        title_style="none",
-        width=table_width
-    )
-    live_table.add_column("Mục", style="dim", width=col1_width, justify="left")
-    live_table.add_column("Số lượng", width=col2_width, justify="right")
-    live_table.add_row("Live đã xem", str(insights.get("Live Sessions Watched Count", 0)))
-    live_table.add_row("Bình luận trong Live", str(insights.get("Live Comments Made Count", 0)))
-    console.print(live_table)
-
-    other_table = Table(
-        title="| ⚙️  Cài Đặt & Dữ Liệu Khác",
-        show_header=False,
-        show_lines=False,
-        title_style="none",
-        title_justify="left",
-        width=table_width
-    )
-    other_table.add_column("Mục", style="dim", width=col1_width, justify="left")
-    other_table.add_column("Giá trị / Số lượng", width=col2_width, justify="right") 
-    other_table.add_row("Ngôn ngữ ứng dụng", insights.get("App Language", "N/A"))
-    other_table.add_row("Tài khoản riêng tư", str(insights.get("Private Account", "N/A"))) 
-    other_table.add_row("Quảng cáo cá nhân hoá", str(insights.get("Personalized Ads", "N/A"))) 
-    other_table.add_row("Bộ lọc từ khoá FYP", str(insights.get("FYP Keyword Filters Count",0)))
-    other_table.add_row("Sự kiện hoạt động Off-TikTok", str(insights.get("Off-TikTok Activity Events Count", 0)))
-    console.print(other_table)
 
+def build_section_frame(records):
+    """
+    Chuyển danh sách bản ghi (dict) của một phần dữ liệu thành DataFrame.
+
+    Danh sách cột được lấy trước từ hợp các khóa của mọi bản ghi (giữ thứ tự xuất hiện)
+    rồi truyền vào `pd.DataFrame.from_records`, nhanh hơn để pandas tự dò cột
+    từ từng dict. Kết quả giống hệt `pd.DataFrame(records)`.
+
+    Args:
+        records (list | pd.DataFrame): Danh sách bản ghi, hoặc DataFrame đã dựng sẵn.
+
+    Returns:
+        pd.DataFrame: DataFrame của phần dữ liệu.
+    """
+    if isinstance(records, pd.DataFrame):
+        return records
+    if not isinstance(records[0], dict):
+        return pd.DataFrame(records)
+    columns = list(dict.fromkeys(chain.from_iterable(records)))
+    return pd.DataFrame.from_records(records, columns=columns, coerce_float=False)
+
+def collect_detailed_sections(data, include=ALL_DETAILED_SHEETS):
+    """
+    Lần lượt sinh ra các phần dữ liệu chi tiết (lịch sử xem, danh sách thích,
+    bình luận, v.v.) dưới dạng danh sách bản ghi, sẵn sàng để chuyển thành DataFrame.
+
+    Mỗi phần chỉ được lấy ra bằng `safe_pop_data` (tức là bị xoá khỏi `data`) khi
+    đến lượt nó, để bộ nhớ của phần trước có thể được giải phóng ngay sau khi ghi.
 
-def export_detailed_data_to_excel(data, excel_writer):
+    Args:
+        data (dict): Từ điển chứa toàn bộ dữ liệu thô của TikTok.
+        include (frozenset, optional): Tên các sheet cần lấy. Mặc định là tất cả.
+
+    Yields:
+        tuple: (tên sheet, danh sách bản ghi hoặc DataFrame). Chỉ gồm các phần có dữ liệu,
+               theo đúng thứ tự các sheet trong báo cáo.
+    """
+    for sheet_name, _, path, container_type, to_records in SECTIONS:
+        if sheet_name not in include:
+            continue
+        value = safe_pop_data(data, path, container_type())
+        if not value:
+            continue
+        yield sheet_name, to_records(value) if to_records else value
+
+def export_detailed_data_to_excel(data, excel_writer, include=ALL_DETAILED_SHEETS):
     """
     Xuất các danh sách dữ liệu chi tiết vào các sheet riêng biệt của một tệp Excel.
 
-    Hàm này duyệt qua dữ liệu thô, chuyển đổi các phần dữ liệu như lịch sử xem,
-    danh sách thích, bình luận, v.v., thành các DataFrame của Pandas và ghi chúng
-    vào đối tượng `ExcelWriter` được cung cấp.
+    Các phần dữ liệu từ `collect_detailed_sections` được chuyển thành DataFrame
+    và ghi lần lượt vào đối tượng `ExcelWriter` được cung cấp.
 
     Args:
         data (dict): Từ điển chứa toàn bộ dữ liệu thô của TikTok.
         excel_writer (pd.ExcelWriter): Đối tượng `ExcelWriter` của Pandas để
                                        ghi dữ liệu vào tệp Excel.
+        include (frozenset, optional): Tên các sheet cần xuất. Mặc định là tất cả.
 
     Returns:
         Ghi dữ liệu vào `excel_writer`.
@@ -359,121 +791,145 @@ def export_detailed_data_to_excel(data, excel_writer):
     if not data:
         return
 
-    watch_history = safe_get_data(data, WATCH_HISTORY_PATH, [])
-    if watch_history:
-        pd.DataFrame(watch_history).to_excel(excel_writer, sheet_name="Watch History", index=False)
-
-    like_list = safe_get_data(data, LIKE_LIST_PATH, [])
-    if like_list:
-        pd.DataFrame(like_list).to_excel(excel_writer, sheet_name="Liked Videos", index=False)
-
-    comments = safe_get_data(data, COMMENT_LIST_PATH, [])
-    if comments:
-        pd.DataFrame(comments).to_excel(excel_writer, sheet_name="Comments Made", index=False)
-
-    searches = safe_get_data(data, SEARCH_LIST_PATH, [])
-    if searches:
-        pd.DataFrame(searches).to_excel(excel_writer, sheet_name="Search History", index=False)
-
-    logins = safe_get_data(data, LOGIN_HISTORY_PATH, [])
-    if logins:
-        pd.DataFrame(logins).to_excel(excel_writer, sheet_name="Login History", index=False)
-        
-    blocked = safe_get_data(data, BLOCKED_USERS_PATH, [])
-    if blocked:
-        pd.DataFrame(blocked).to_excel(excel_writer, sheet_name="Blocked Users", index=False)
-
-    followers = safe_get_data(data, FOLLOWER_LIST_PATH, [])
-    if followers:
-        pd.DataFrame(followers).to_excel(excel_writer, sheet_name="Followers", index=False)
-
-    following = safe_get_data(data, FOLLOWING_LIST_PATH, [])
-    if following:
-        pd.DataFrame(following).to_excel(excel_writer, sheet_name="Following", index=False)
-        
-    fav_videos = safe_get_data(data, FAVORITE_VIDEOS_PATH, [])
-    if fav_videos:
-        pd.DataFrame(fav_videos).to_excel(excel_writer, sheet_name="Favorite Videos", index=False)
-
-    fav_sounds = safe_get_data(data, FAVORITE_SOUNDS_PATH, [])
-    if fav_sounds:
-        pd.DataFrame(fav_sounds).to_excel(excel_writer, sheet_name="Favorite Sounds", index=False)
-        
-    orders_dict = safe_get_data(data, ORDER_HISTORY_PATH, {})
-    if orders_dict:
-        orders_list = []
-        for order_id, order_details in orders_dict.items():
-            order_details['order_id_from_key'] = order_id 
-            orders_list.append(order_details)
-        if orders_list:
-            pd.DataFrame(orders_list).to_excel(excel_writer, sheet_name="Shop Order History", index=False)
-            
-    browsing = safe_get_data(data, PRODUCT_BROWSING_PATH, [])
-    if browsing:
-        pd.DataFrame(browsing).to_excel(excel_writer, sheet_name="Shop Product Browsing", index=False)
+    for sheet_name, records in collect_detailed_sections(data, include):
+        build_section_frame(records).to_excel(excel_writer, sheet_name=sheet_name, index=False)
 
-    cart = safe_get_data(data, SHOPPING_CART_PATH, [])
-    if cart:
-        pd.DataFrame(cart).to_excel(excel_writer, sheet_name="Shop Shopping Cart", index=False)
 
-    live_map = safe_get_data(data, WATCH_LIVE_HISTORY_PATH, {})
-    live_list_for_excel = []
-    if live_map:
-        for live_id, details in live_map.items():
-            entry = {"LiveSessionID": live_id, "WatchTime": details.get("WatchTime")}
-            comments = details.get("Comments", [])
-            valid_comments = [c.get("CommentContent") for c in comments if c.get("CommentContent", "") != "" or c.get("RawTime", -1) != -1]
-            entry["CommentsInLive"] = "; ".join(valid_comments) if valid_comments else ""
-            live_list_for_excel.append(entry)
-        if live_list_for_excel:
-            pd.DataFrame(live_list_for_excel).to_excel(excel_writer, sheet_name="Watch Live History", index=False)
-
-    dm_history = safe_get_data(data, DM_CHAT_HISTORY_PATH, {})
-    all_dms_flat = []
-    if dm_history:
-        for chat_with, messages in dm_history.items():
-            chat_name = chat_with.replace("Chat History with ", "").replace(":", "")
-            if isinstance(messages, list):
-                for msg in messages:
-                    msg_copy = msg.copy()
-                    msg_copy["ChatWith"] = chat_name
-                    all_dms_flat.append(msg_copy)
-        if all_dms_flat:
-             pd.DataFrame(all_dms_flat).to_excel(excel_writer, sheet_name="Direct Messages", index=False)
-
-
-def export_insights_to_excel(insights, full_data, excel_path="tiktok_analysis_summary.xlsx"):
+def export_detailed_data_to_parquet(data, output_dir=".", include=ALL_DETAILED_SHEETS):
+    """
+    Xuất từng phần dữ liệu chi tiết ra một tệp Parquet riêng (nén zstd).
+
+    Parquet là định dạng dạng cột, ghi nhanh và nhỏ hơn nhiều so với Excel với
+    các bảng lớn như lịch sử xem hay tin nhắn. Cần cài đặt thư viện `pyarrow`.
+    Lỗi ở một phần (ví dụ cột có kiểu dữ liệu lẫn lộn) chỉ bỏ qua phần đó.
+
+    Args:
+        data (dict): Từ điển chứa toàn bộ dữ liệu thô của TikTok.
+        output_dir (str, optional): Thư mục chứa các tệp Parquet. Mặc định là ".".
+        include (frozenset, optional): Tên các phần cần xuất. Mặc định là tất cả.
+
+    Returns:
+        Tạo ra các tệp `tiktok_<tên_sheet>.parquet` trong `output_dir`.
+    """
+    if not data:
+        return
+
+    section_count = 0
+    for sheet_name, records in collect_detailed_sections(data, include):
+        parquet_path = os.path.join(output_dir, f"tiktok_{sheet_name.lower().replace(' ', '_')}.parquet")
+        try:
+            build_section_frame(records).to_parquet(parquet_path, compression="zstd", index=False)
+            section_count += 1
+        except ImportError:
+            console.print(f"| ❌ Lỗi: Thư viện 'pyarrow' chưa được cài đặt. Hãy chạy: pip install pyarrow", style="red")
+            return
+        except Exception as e:
+            console.print(f"| ❌ Lỗi khi xuất '[yellow]{sheet_name}[/yellow]' ra Parquet: {e}", style="red")
+
+    if section_count:
+        console.print(f"| 💾 Đã xuất {section_count} bảng dữ liệu chi tiết ra Parquet trong: [cyan]{output_dir}[/cyan]")
+
+def write_summary_sheet(excel_writer, insights, sheet_name="Tổng Quan"):
+    """
+    Ghi trực tiếp bảng tổng quan (khoảng vài chục dòng) vào một sheet mới,
+    không cần dựng DataFrame. Dùng được cho cả engine openpyxl và xlsxwriter.
+    Giá trị không phải kiểu cơ bản (dict, list, ...) được ghi dưới dạng chuỗi.
+
+    Args:
+        excel_writer (pd.ExcelWriter): Đối tượng `ExcelWriter` của Pandas.
+        insights (dict): Từ điển chứa dữ liệu tổng quan.
+        sheet_name (str, optional): Tên sheet. Mặc định là "Tổng Quan".
+
+    Returns:
+        Ghi dữ liệu vào `excel_writer`.
+    """
+    header = ['Mục Phân Tích', 'Giá trị']
+    rows = [
+        (key, value if value is None or isinstance(value, (str, int, float, bool)) else str(value))
+        for key, value in insights.items()
+    ]
+    book = excel_writer.book
+    if hasattr(book, 'add_worksheet'):
+        worksheet = book.add_worksheet(sheet_name)
+        worksheet.write_row(0, 0, header, book.add_format({'bold': True}))
+        for row_idx, row in enumerate(rows, start=1):
+            worksheet.write_row(row_idx, 0, row)
+    else:
+        from openpyxl.styles import Font
+        worksheet = book.create_sheet(sheet_name)
+        worksheet.append(header)
+        for cell in worksheet[1]:
+            cell.font = Font(bold=True)
+        for row in rows:
+            worksheet.append(row)
+
+def export_insights_to_excel(insights, full_data, excel_path="tiktok_analysis_summary.xlsx", export_format="excel", include=ALL_DETAILED_SHEETS):
     """
     Điều phối việc xuất cả dữ liệu tổng quan và chi tiết ra một tệp Excel duy nhất.
 
     Hàm này tạo một tệp Excel, ghi dữ liệu tổng hợp `insights` vào một sheet
     tên là "Tổng Quan", sau đó gọi hàm `export_detailed_data_to_excel` để ghi
-    tất cả các dữ liệu chi tiết khác vào các sheet còn lại.
+    tất cả các dữ liệu chi tiết khác vào các sheet còn lại. Với
+    `export_format="parquet"`, tệp Excel chỉ chứa sheet tổng quan và dữ liệu
+    chi tiết được ghi ra các tệp Parquet bằng `export_detailed_data_to_parquet`.
 
     Args:
         insights (dict): Từ điển chứa dữ liệu tổng quan.
         full_data (dict): Từ điển chứa toàn bộ dữ liệu thô của TikTok.
         excel_path (str, optional): Tên và đường dẫn của tệp Excel đầu ra.
                                     Mặc định là "tiktok_analysis_summary.xlsx".
+        export_format (str, optional): "excel" hoặc "parquet" cho dữ liệu chi tiết.
+                                       Mặc định là "excel".
+        include (frozenset, optional): Tên các sheet chi tiết cần xuất. Mặc định là tất cả.
 
     Returns:
-        Tạo ra một tệp Excel.
+        Tạo ra một tệp Excel (và các tệp Parquet nếu được chọn).
     """
     console.print(f"\n📚 [bold green]Xuất ra EXCEL[/bold green]")
     if not insights:
-        console.print(f"| ⚠️ Không có thông tin chi tiết để xuất ra Excel.[/red]")
+        console.print(f"| ⚠️ Không có thông tin chi tiết để xuất ra Excel.", style="yellow")
         return
 
     try:
-        with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-            summary_df = pd.DataFrame(list(insights.items()), columns=['Mục Phân Tích', 'Giá trị'])
-            summary_df.to_excel(writer, sheet_name="Tổng Quan", index=False)
+        with pd.ExcelWriter(excel_path, engine=EXCEL_ENGINE) as writer:
+            write_summary_sheet(writer, insights)
             
-            export_detailed_data_to_excel(full_data, writer)
+            if export_format != "parquet":
+                export_detailed_data_to_excel(full_data, writer, include)
 
         console.print(f"| 💾 Đã xuất kết quả phân tích chi tiết ra: [cyan]{excel_path}[/cyan]")
     except Exception as e:
-        console.print(f"| ❌ Lỗi khi xuất ra Excel: {e}[/red]")
+        console.print(f"| ❌ Lỗi khi xuất ra Excel: {e}", style="red")
+
+    skipped_sheets = [name for name, *_ in SECTIONS if name in ALL_DETAILED_SHEETS - include]
+    if skipped_sheets:
+        console.print(f"| ℹ️ Bỏ qua dữ liệu chi tiết: {', '.join(skipped_sheets)} (dùng --full để xuất).")
+
+    if export_format == "parquet":
+        export_detailed_data_to_parquet(full_data, output_dir=os.path.dirname(excel_path) or ".", include=include)
+
+def find_tiktok_zip_files(data_dir=ZIP_DATA_DIR):
+    """
+    Tìm các tệp ZIP dữ liệu TikTok (TikTok_Data_*.zip) trong thư mục dữ liệu.
+
+    Dùng `os.scandir` và so sánh tiền tố/hậu tố tên tệp, thay vì `glob` phải dịch
+    mẫu và so khớp fnmatch cho từng mục trong thư mục.
+
+    Args:
+        data_dir (str, optional): Thư mục chứa dữ liệu. Mặc định là `ZIP_DATA_DIR`.
+
+    Returns:
+        list: Danh sách đường dẫn các tệp ZIP tìm được (đã sắp xếp), rỗng nếu
+              thư mục không tồn tại.
+    """
+    try:
+        with os.scandir(data_dir) as entries:
+            return sorted(
+                entry.path for entry in entries
+                if entry.name.startswith(ZIP_FILE_PREFIX) and entry.name.endswith(ZIP_FILE_SUFFIX) and entry.is_file()
+            )
+    except (FileNotFoundError, NotADirectoryError):
+        return []
 
 def main():
     """
@@ -485,11 +941,29 @@ def main():
     3. Nếu tải thành công, gọi hàm để trích xuất các thông tin chi tiết.
     4. Hiển thị kết quả tổng quan ra console.
     5. Xuất báo cáo đầy đủ (tổng quan và chi tiết) ra tệp Excel.
+
+    Với tùy chọn `--insights-only`, chương trình chỉ đếm các phần dữ liệu lớn
+    (không dựng từng phần tử), hiển thị kết quả tổng quan và bỏ qua bước xuất Excel.
+    Mặc định các sheet lớn (`LARGE_DETAILED_SHEETS`) không được xuất; dùng `--full`
+    để xuất toàn bộ dữ liệu chi tiết. Với `--low-memory`, tệp JSON được đọc dạng luồng
+    và các phần không xuất chỉ được đếm. `--format parquet` ghi dữ liệu chi tiết
+    ra các tệp Parquet thay vì các sheet Excel.
     """
+    parser = argparse.ArgumentParser(description="Phân tích dữ liệu TikTok.")
+    parser.add_argument("--insights-only", action="store_true",
+                        help="Chỉ hiển thị kết quả tổng quan, không xuất Excel (ít bộ nhớ hơn khi có ijson).")
+    parser.add_argument("--full", action="store_true",
+                        help="Xuất cả các sheet lớn (Watch History, Direct Messages) ra Excel.")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="Đọc tệp JSON dạng luồng bằng ijson, chỉ giữ các phần cần dùng (ít bộ nhớ hơn nhưng chậm hơn).")
+    parser.add_argument("--format", choices=("excel", "parquet"), default="excel",
+                        help="Định dạng xuất dữ liệu chi tiết: một tệp Excel (mặc định) hoặc các tệp Parquet (cần pyarrow).")
+    args = parser.parse_args()
+
     ZIP_FILE_PATH = None
     zip_file_pattern = ZIP_FILE_PATTERN
 
-    zip_files_found = glob.glob(zip_file_pattern)
+    zip_files_found = find_tiktok_zip_files()
     console.print(f"🚀[bold green] Bắt đầu phân tích dữ liệu TIKTOK[bold green]")         
     if not zip_files_found:
         console.print(f"| 🚫 Không tìm thấy tệp ZIP nào khớp với mẫu '[yellow]{zip_file_pattern}[/yellow]' trong thư mục hiện tại.")
@@ -501,20 +975,29 @@ def main():
         console.print(f"| 📄 Sử dụng tệp dữ liệu: [cyan]{ZIP_FILE_PATH}[/cyan]")
 
     if ZIP_FILE_PATH and os.path.exists(ZIP_FILE_PATH):
-        tiktok_data = load_tiktok_data_from_zip(ZIP_FILE_PATH, internal_file_pattern="user_data*.json")
+        section_counts = None
+        if args.insights_only:
+            tiktok_data, section_counts = load_tiktok_section_counts_from_zip(ZIP_FILE_PATH, internal_file_pattern="user_data*.json")
+        elif args.low_memory and not args.full:
+            tiktok_data, section_counts = load_tiktok_section_counts_from_zip(ZIP_FILE_PATH, internal_file_pattern="user_data*.json", built_paths=DETAILED_BUILT_PATHS)
+        else:
+            wanted_paths = WANTED_PATHS if args.low_memory else None
+            tiktok_data = load_tiktok_data_from_zip(ZIP_FILE_PATH, internal_file_pattern="user_data*.json", wanted_paths=wanted_paths)
 
-        if tiktok_data:
-            insights = extract_tiktok_insights(tiktok_data)
+        if tiktok_data or section_counts:
+            insights = extract_tiktok_insights(tiktok_data, section_counts)
             username = insights.get("Username", "Người dùng")
             
             console.print(f"\n📊[bold green] Kết quả phân tích[/bold green]")
             display_insights_rich(insights, username=username)
             
-            export_insights_to_excel(insights, tiktok_data, excel_path="tiktok_analysis_report.xlsx")
+            if not args.insights_only:
+                detailed_sheets = ALL_DETAILED_SHEETS if args.full else DETAILED_SHEETS
+                export_insights_to_excel(insights, tiktok_data, excel_path="tiktok_analysis_report.xlsx", export_format=args.format, include=detailed_sheets)
         else:
             console.print(f"| ⚠️ Không thể tải hoặc xử lý dữ liệu TikTok từ tệp đã chọn.")
     elif ZIP_FILE_PATH and not os.path.exists(ZIP_FILE_PATH):
-        console.print(f"| ❌ Tệp ZIP '{ZIP_FILE_PATH}' được tìm thấy bởi glob nhưng không thể truy cập. Kiểm tra lại đường dẫn và quyền.")
+        console.print(f"| ❌ Tệp ZIP '{ZIP_FILE_PATH}' đã được tìm thấy nhưng không thể truy cập. Kiểm tra lại đường dẫn và quyền.")
     else:
         pass
 